@@ -0,0 +1,98 @@
+"""
+App resolution latency (core/apps.py) across large synthetic catalogs.
+Run from the repo root:  python -m benchmarks.apps_bench [sizes ...]
+Measures the trigram index build, exact / prefix / misspelled / unknown-name
+lookups, and a full scan vs an unchanged refresh of a directory of .desktop
+files. The old Start-menu path cost at least 0.6 s of sleeps per launch.
+"""
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+from core.apps import AppIndex, AppResolver, _scan_desktop_dir
+
+SIZES = (1_000, 10_000, 100_000)
+QUERIES = 300
+WORDS = ("studio", "player", "editor", "manager", "office", "viewer", "pro", "lite", "code", "music",
+         "photo", "video", "chat", "mail", "notes", "maps", "terminal", "browser", "sync", "cloud")
+
+def catalog(rng, size):
+    apps, seen = [], set()
+    while len(apps) < size:
+        brand = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).capitalize()
+        name = " ".join([brand] + rng.sample(WORDS, rng.randint(0, 2)))
+        if name in seen: continue
+        seen.add(name)
+        apps.append((name, f"/opt/{brand.lower()}/bin/{brand.lower()}", "desktop", brand.lower()))
+    return apps
+
+def typo(rng, name):
+    i = rng.randrange(1, len(name) - 1)
+    return rng.choice([name[:i] + name[i + 1:],                      # dropped letter
+                       name[:i] + name[i + 1] + name[i] + name[i + 2:], # swapped letters
+                       name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]])
+
+def timed(index, queries, wanted=None):
+    timings, hits = [], 0
+    for i, q in enumerate(queries):
+        t = time.perf_counter()
+        app, _ = index.match(q)
+        timings.append(time.perf_counter() - t)
+        if wanted and app is not None and app[0] == wanted[i]: hits += 1
+    timings.sort()
+    result = {"p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+              "p95_us": round(timings[int(len(timings) * 0.95)] * 1e6, 1)}
+    if wanted: result["correct"] = f"{hits}/{len(queries)}"
+    return result
+
+def bench_scan(rng, size=2_000):
+    path = tempfile.mkdtemp(prefix="luna_apps_")
+    try:
+        apps_dir = os.path.join(path, "applications")
+        os.makedirs(apps_dir)
+        for name, target, _, _ in catalog(rng, size):
+            with open(os.path.join(apps_dir, f"{name.replace(' ', '-')}.desktop"), "w") as f:
+                f.write(f"[Desktop Entry]\nType=Application\nName={name}\nExec={target} %U\n")
+        resolver = AppResolver(os.path.join(path, "apps.json"), sources=[(apps_dir, _scan_desktop_dir, True)])
+        t = time.perf_counter()
+        resolver.refresh()
+        full = time.perf_counter() - t
+        reloaded = AppResolver(resolver.path, sources=resolver.sources)  # next start: index comes from apps.json
+        t = time.perf_counter()
+        reloaded.refresh()
+        cached = time.perf_counter() - t
+        t = time.perf_counter()
+        reloaded.refresh()
+        unchanged = time.perf_counter() - t
+        return {"desktop_files": size, "full_scan_ms": round(full * 1000, 1),
+                "start_from_cache_ms": round(cached * 1000, 1), "unchanged_refresh_ms": round(unchanged * 1000, 2)}
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def run(sizes=SIZES):
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        apps = catalog(rng, size)
+        t = time.perf_counter()
+        index = AppIndex(apps)
+        build = time.perf_counter() - t
+        picks = rng.sample(apps, QUERIES)
+        names = [a[0] for a in picks]
+        results.append({
+            "apps": size, "build_ms": round(build * 1000, 1), "trigrams": len(index.table),
+            "exact": timed(index, [n.lower() for n in names], names),
+            "prefix": timed(index, [a[3][:max(4, len(a[3]) - 2)] for a in picks], names),
+            "typo": timed(index, [typo(rng, a[3]) for a in picks], names),
+            "unknown": timed(index, ["".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(QUERIES)]),
+        })
+        print(results[-1])
+    results.append(bench_scan(rng))
+    print(results[-1])
+    return results
+
+if __name__ == "__main__":
+    run(tuple(int(a) for a in sys.argv[1:]) or SIZES)
@@ -0,0 +1,301 @@
+"""
+End-to-end latency benchmark of the hot path with no live services.
+Drives Brain.process_input (with and without speculative chat), Brain._trigger_curiosity, user turns
+that interrupt a window comment mid-generation and a turn with Ollama unreachable against local stand-ins:
+a fake Ollama HTTP server (real ollama client, configurable token rate), a fake
+Gemini router with configurable latency, a fake TTS and a null window.
+Run from the repo root:  python -m benchmarks.e2e_bench [--turns 20] [--baseline old.json]
+Results go to benchmarks/results/e2e_<commit>.json for comparison across commits.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+REPLY = ("Oh, that sounds like fun! I would love to hear more about it. "
+         "Tell me what happened next, and don't skip the good parts. I'm all ears!")
+# Mostly chat; the vague ones miss the local router and go to the (fake) Gemini
+TURNS = ["hi luna", "how was your day?", "tell me a joke", "I'm a bit bored",
+         "hmm what do you reckon about that thing", "that movie last night was wild",
+         "do you like music?", "could you maybe sort of handle it"]
+WINDOWS = ["Visual Studio Code - main.py", "YouTube - Lofi beats", "Inbox - Gmail", "Spotify Premium"]
+
+# --- FAKE OLLAMA ---
+class FakeOllama:
+    """Speaks enough of Ollama's HTTP API (/api/chat, /api/generate) for ollama.Client."""
+    def __init__(self, tokens_per_s=40.0, prefill_ms=80.0, reply=REPLY):
+        self.tokens_per_s = tokens_per_s
+        self.prefill_ms = prefill_ms
+        self.tokens = [w + " " for w in reply.split(" ")]
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def log_message(self, *args): pass
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+                if self.path == "/api/chat": fake.chat(self, body)
+                elif self.path == "/api/generate": fake.send(self, [fake.final(body, response="")])
+                else: fake.send(self, [{"error": "not found"}], status=404)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def final(self, body, **extra):
+        prompt = sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4
+        return {"model": body.get('model'), "created_at": "2024-01-01T00:00:00Z", "done": True,
+                "done_reason": "stop", "load_duration": 1_000_000, "prompt_eval_count": prompt,
+                "prompt_eval_duration": int(self.prefill_ms * 1e6), "eval_count": len(self.tokens),
+                "eval_duration": int(len(self.tokens) / self.tokens_per_s * 1e9), **extra}
+
+    def chat(self, handler, body):
+        time.sleep(self.prefill_ms / 1000)
+        if not body.get('stream', True):
+            time.sleep(len(self.tokens) / self.tokens_per_s)
+            message = {"role": "assistant", "content": "".join(self.tokens)}
+            return self.send(handler, [self.final(body, message=message)])
+        def chunks():
+            for token in self.tokens:
+                time.sleep(1 / self.tokens_per_s)
+                yield {"model": body.get('model'), "created_at": "2024-01-01T00:00:00Z",
+                       "message": {"role": "assistant", "content": token}, "done": False}
+            yield self.final(body, message={"role": "assistant", "content": ""})
+        self.send(handler, chunks())
+
+    def send(self, handler, chunks, status=200):
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        try:
+            for chunk in chunks:
+                line = (json.dumps(chunk) + "\n").encode()
+                handler.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                handler.wfile.flush()
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError): pass  # the client cancelled the stream
+
+# --- FAKE GEMINI ---
+class FakeGemini:
+    """Router stand-in: answers {"action": "chat"} after `latency_ms`."""
+    # Just enough of google.genai.types for SkillSet to build its request configs
+    types = types.SimpleNamespace(GenerateContentConfig=lambda **kw: kw, Tool=lambda **kw: kw,
+                                  GoogleSearch=lambda **kw: kw)
+
+    def __init__(self, latency_ms=400.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.models = self
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return types.SimpleNamespace(text='{"action": "chat"}')
+
+# --- FAKE TTS / NULL WINDOW ---
+def make_voice(synth_ms, play_ms_per_char, clock):
+    from core.playback import DummyDriver
+    from core.tts import TTSBackend
+    from core.voice import VoiceEngine
+
+    class FakeTTS(TTSBackend):
+        def synthesize(self, text, voice_id):
+            time.sleep(synth_ms / 1000)
+            return b"\0" * (len(text) * 16)
+
+    class BenchDriver(DummyDriver):
+        """Silent timed playback that marks when the first audio of a turn starts."""
+        def play(self, audio):
+            clock.mark("audio")
+            super().play(audio)
+
+        def current(self):
+            playing = super().current()
+            if playing is not None: clock.mark("audio")  # a gapless follow-on counts too
+            return playing
+
+    def make():
+        return VoiceEngine(backend=FakeTTS(), driver=BenchDriver(bytes_per_second=16_000 / play_ms_per_char))
+    return make
+
+class NullWindow:
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = 0
+
+    def evaluate_js(self, js):
+        self.calls += 1
+        if '"chunk"' in js: self.clock.mark("chunk")
+        if '"complete"' in js: self.clock.mark("complete")
+
+class TurnClock:
+    """First time each event happens after start()."""
+    def __init__(self):
+        self.t0, self.first = None, {}
+
+    def start(self):
+        self.t0, self.first = time.perf_counter(), {}
+
+    def mark(self, event):
+        if self.t0 is not None and event not in self.first:
+            self.first[event] = (time.perf_counter() - self.t0) * 1000
+
+# --- RUN ---
+def pct(xs, q):
+    xs = sorted(x for x in xs if x is not None)
+    if not xs: return None
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 1)
+
+def summarize(samples):
+    keys = samples[0].keys() if samples else ()
+    return {k: {"p50": pct([s[k] for s in samples], 0.5), "p95": pct([s[k] for s in samples], 0.95)}
+            for k in keys}
+
+def dead_host():
+    """URL of a local port nothing listens on."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+def commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                               text=True).stdout.strip() or "unknown"
+    except OSError: return "unknown"
+
+def run(args):
+    ollama_server = FakeOllama(args.token_rate, args.prefill_ms)
+    os.environ["OLLAMA_HOST"] = ollama_server.url  # before ollama is imported
+    gemini = FakeGemini(args.router_ms)
+    clock = TurnClock()
+
+    import core.brain as brain_mod
+    import core.skills as skills_mod
+    from core.intent_cache import IntentCache
+    from core.llm import LLMSession
+    from core.scheduler import PRIORITY_USER, PRIORITY_AUTONOMY
+    from core.tracing import TRACER
+    brain_mod.VoiceEngine = make_voice(args.tts_ms, args.play_ms_per_char, clock)
+    skills_mod.types = FakeGemini.types
+    skills_mod.SkillSet._init_gemini = lambda self: setattr(self, '_gemini', gemini)
+
+    window, ready = NullWindow(clock), threading.Event()
+    ready.set()
+    brain = brain_mod.Brain(window, llm=LLMSession(brain_mod.MODEL_NAME).wait_ready(30), ui_ready=ready)
+    for stage in brain.startup.status(): brain.startup.get(stage, 30)  # measure steady state, not warm-up
+
+    saves = []
+    def timed(fn):
+        def wrapper(*a, **kw):
+            start = time.perf_counter()
+            try: return fn(*a, **kw)
+            finally: saves.append(time.perf_counter() - start)
+        return wrapper
+    brain._remember, brain._save_memory = timed(brain._remember), timed(brain._save_memory)
+
+    def measure(fn, *a):
+        del saves[:]
+        calls = window.calls
+        clock.start()
+        fn(*a)
+        brain.speech.wait(60)  # playback runs on its own thread: count it in the total
+        total = (time.perf_counter() - clock.t0) * 1000
+        return {"ttft_ms": clock.first.get("chunk"), "first_audio_ms": clock.first.get("audio"),
+                "total_ms": total, "bridge_calls": window.calls - calls, "memory_save_ms": sum(saves) * 1000}
+
+    def interrupted(text, window_title):
+        """A user turn arriving while a window comment is mid-generation; timed from the user's message."""
+        brain.scheduler.submit(PRIORITY_AUTONOMY, brain._trigger_curiosity, window_title)
+        time.sleep(args.prefill_ms / 1000 + 0.1)
+        done = threading.Event()
+        clock.start()
+        brain.scheduler.submit(PRIORITY_USER, lambda t, cancel: (brain.process_input(t, cancel), done.set()),
+                               text, barge_in=True)
+        done.wait(60)
+
+    def chat_pass(speculative):
+        # Same turns, same cold intent cache: only speculation differs between the two passes
+        brain.speculative = speculative
+        brain.skills.router.cache = IntentCache(path=None, schema=brain.skills.registry.cache_schema())
+        return [measure(brain.process_input, TURNS[i % len(TURNS)]) for i in range(args.turns)]
+
+    speculative = brain.speculative
+    chat, sequential = chat_pass(True), chat_pass(False)
+    brain.speculative = speculative
+    curiosity = [measure(brain._trigger_curiosity, f"{WINDOWS[i % len(WINDOWS)]} ({i})")
+                 for i in range(max(1, args.turns // 4))]
+    barge_in = [measure(interrupted, TURNS[i % len(TURNS)], f"{WINDOWS[i % len(WINDOWS)]} [{i}]")
+                for i in range(max(1, args.turns // 4))]
+    # Ollama down: the turn must still end with 'complete', or API clients wait out their timeout
+    llm, brain.llm = brain.llm, LLMSession(brain_mod.MODEL_NAME, host=dead_host())
+    llm_down = measure(brain.process_input, TURNS[0])
+    llm_down["complete_ms"] = clock.first.get("complete")
+    brain.llm = llm
+    brain.shutdown()
+    return {
+        "commit": commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {"turns": args.turns, "token_rate": args.token_rate, "prefill_ms": args.prefill_ms,
+                   "router_ms": args.router_ms, "tts_ms": args.tts_ms, "play_ms_per_char": args.play_ms_per_char},
+        "process_input": summarize(chat), "process_input_sequential": summarize(sequential),
+        "speculation": brain.spec_stats.report(), "trigger_curiosity": summarize(curiosity),
+        "user_during_autonomy": summarize(barge_in), "llm_down": llm_down,
+        "router_remote_calls": gemini.calls, "llm": [llm.report() for llm in (brain.llm, brain.quick) if llm],
+        "session": brain.metrics(),
+        "stages": TRACER.summary()["stages"],
+    }
+
+def compare(result, baseline):
+    """Prints p50/p95 changes against an earlier result file."""
+    for section in ("process_input", "process_input_sequential", "trigger_curiosity", "user_during_autonomy"):
+        for key, now in result[section].items():
+            old = baseline.get(section, {}).get(key)
+            if not old: continue
+            for q in ("p50", "p95"):
+                if now[q] is None or not old.get(q): continue
+                print(f"{section}.{key}.{q}: {old[q]} -> {now[q]} ({(now[q] - old[q]) / old[q] * 100:+.0f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--token-rate", type=float, default=40.0, help="fake Ollama tokens per second")
+    parser.add_argument("--prefill-ms", type=float, default=80.0)
+    parser.add_argument("--router-ms", type=float, default=400.0, help="fake Gemini latency")
+    parser.add_argument("--tts-ms", type=float, default=150.0, help="fake synthesis time per sentence")
+    parser.add_argument("--play-ms-per-char", type=float, default=1.0)
+    parser.add_argument("--out", help="result file (default benchmarks/results/e2e_<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    out = os.path.abspath(args.out) if args.out else None
+    # Scratch working dir: the conversation store, caches and summary are relative paths
+    with tempfile.TemporaryDirectory() as cwd:
+        os.makedirs(os.path.join(cwd, "core"))
+        os.chdir(cwd)
+        result = run(args)
+        os.chdir(ROOT)
+
+    out = out or os.path.join(RESULTS_DIR, f"e2e_{result['commit']}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f: json.dump(result, f, indent=2)
+    print(json.dumps({k: result[k] for k in ("process_input", "process_input_sequential", "speculation",
+                                             "trigger_curiosity", "user_during_autonomy", "llm")},
+                     indent=2))
+    print(f"[Bench] Saved {out}")
+    if args.baseline:
+        with open(args.baseline) as f: compare(result, json.load(f))
+    if result["llm_down"]["complete_ms"] is None:
+        sys.exit("[Bench] FAIL: a turn with Ollama down never sent 'complete'")
+
+if __name__ == "__main__":
+    main()
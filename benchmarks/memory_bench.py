@@ -0,0 +1,54 @@
+"""
+Query latency of the semantic memory index (core/semantic_memory.py) at scale.
+Run from the repo root:  python -m benchmarks.memory_bench [dims]
+Random unit vectors stand in for real embeddings; the index files go to a temp dir.
+"""
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from core.semantic_memory import MemoryIndex, HashingEmbedder
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 50
+BATCH = 50_000
+
+def run(dims=256):
+    rng = np.random.default_rng(0)
+    results = []
+    for size in SIZES:
+        path = tempfile.mkdtemp(prefix="luna_mem_")
+        try:
+            index = MemoryIndex(HashingEmbedder(dims), path=path, capacity=size)
+            start = time.perf_counter()
+            for offset in range(0, size, BATCH):
+                n = min(BATCH, size - offset)
+                vecs = rng.standard_normal((n, dims), dtype=np.float32)
+                vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+                index.add_vectors([f"memory {offset + i}" for i in range(n)], vecs)
+            build = time.perf_counter() - start
+
+            queries = rng.standard_normal((QUERIES, dims), dtype=np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            index.search_vector(queries[0], k=5)  # warm the page cache
+            timings = []
+            for q in queries:
+                t = time.perf_counter()
+                index.search_vector(q, k=5)
+                timings.append(time.perf_counter() - t)
+            timings.sort()
+            results.append({
+                "entries": size, "dims": dims, "build_s": round(build, 2),
+                "matrix_mb": round(size * dims * 4 / 2**20, 1),
+                "query_p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+                "query_p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 2),
+            })
+            print(results[-1])
+            del index
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
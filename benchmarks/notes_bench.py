@@ -0,0 +1,99 @@
+"""
+Write throughput and query latency of the note store (core/notes.py) at scale.
+Run from the repo root:  python -m benchmarks.notes_bench [entries ...]
+Synthetic notes (a Zipf-ish vocabulary, #tags, spread over two years) go to a
+temp dir, along with a year of Notes_<date>.txt files for the import path.
+"""
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from core.notes import NoteStore, parse_when
+
+SIZES = (10_000, 100_000, 300_000)
+QUERIES = 200
+VOCAB = 5000
+TAGS = ("work", "home", "shopping", "ideas", "health", "travel", "music", "code")
+DAYS = 730
+
+def make_words(rng):
+    # A few very common words and a long tail, roughly like real notes
+    return [f"w{i}" for i in range(VOCAB)], [1 / (i + 1) for i in range(VOCAB)]
+
+def note(rng, words, weights):
+    text = " ".join(rng.choices(words, weights, k=rng.randint(4, 14)))
+    if rng.random() < 0.3: text += f" #{rng.choice(TAGS)}"
+    return text
+
+def timed(fn, args_list):
+    timings = []
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+    return {"p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 3)}
+
+def bench_import(path, rng, words, weights, days=365, per_day=20):
+    directory = os.path.join(path, "workspace")
+    os.makedirs(directory)
+    start_day = datetime.date(2024, 1, 1)
+    for d in range(days):
+        day = start_day + datetime.timedelta(days=d)
+        with open(os.path.join(directory, f"Notes_{day.isoformat()}.txt"), "w", encoding="utf-8") as f:
+            for i in range(per_day): f.write(f"[{i % 24:02d}:{i:02d}] {note(rng, words, weights)}\n")
+    store = NoteStore(os.path.join(path, "import.db"))
+    t = time.perf_counter()
+    n = store.import_daily_files(directory)
+    first = time.perf_counter() - t
+    t = time.perf_counter()
+    store.import_daily_files(directory)  # nothing new: only the offsets are checked
+    again = time.perf_counter() - t
+    store.close()
+    return {"files": days, "notes": n, "import_s": round(first, 2), "reimport_ms": round(again * 1000, 1)}
+
+def run(sizes=SIZES):
+    rng = random.Random(0)
+    words, weights = make_words(rng)
+    results = []
+    for size in sizes:
+        path = tempfile.mkdtemp(prefix="luna_notes_")
+        try:
+            store = NoteStore(os.path.join(path, "notes.db"))
+            now = time.time()
+            start = time.perf_counter()
+            for i in range(size): store.add(note(rng, words, weights), ts=now - rng.random() * DAYS * 86400)
+            store.flush()
+            build = time.perf_counter() - start
+
+            rare = [(f"w{rng.randint(1000, VOCAB - 1)}",) for _ in range(QUERIES)]
+            common = [(f"w{rng.randint(0, 20)}",) for _ in range(QUERIES)]
+            pair = [(f"w{rng.randint(0, 200)} w{rng.randint(200, 2000)}",) for _ in range(QUERIES)]
+            store.search(rare[0][0])  # warm the page cache
+            week = parse_when("last week")
+            results.append({
+                "entries": size, "fts": store.fts, "add_per_s": round(size / build),
+                "db_mb": round(os.path.getsize(os.path.join(path, "notes.db")) / 2**20, 1),
+                "rare_word": timed(store.search, rare),
+                "common_word": timed(store.search, common),
+                "two_words": timed(store.search, pair),
+                "date_range": timed(lambda: store.search("", *week), [()] * QUERIES),
+                "word_in_range": timed(lambda q: store.search(q, *week), rare),
+                "tag": timed(lambda t: store.search(f"#{t}"), [(t,) for t in rng.choices(TAGS, k=QUERIES)]),
+                "tag_and_word": timed(lambda q: store.search(f"{q} #work"), common),
+            })
+            print(results[-1])
+            store.close()
+            if size == sizes[0]:
+                results.append(bench_import(path, rng, words, weights))
+                print(results[-1])
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    run(tuple(int(a) for a in sys.argv[1:]) or SIZES)
@@ -0,0 +1,42 @@
+"""
+Offline accuracy/latency benchmark for the local intent router (core/router.py).
+Run from the repo root:  python -m benchmarks.router_bench
+"""
+import json
+from core.router import IntentRouter, benchmark
+
+# (utterance, expected action) - what Gemini would be expected to return
+CASES = [
+    ("hi luna", "chat"), ("how are you today?", "chat"), ("tell me a joke", "chat"),
+    ("you're so funny", "chat"), ("what's your favourite colour", "chat"),
+    ("good night!", "chat"), ("thanks!", "chat"), ("I'm feeling kind of sad", "chat"),
+    ("do you like music?", "chat"), ("who made you", "chat"), ("lol", "chat"),
+    ("I had a good time at the party", "chat"), ("can we play a game", "chat"),
+    ("volume 30", "system"), ("set volume to 50", "system"), ("turn the volume to 80%", "system"),
+    ("brightness 40", "system"), ("mute", "system"), ("mute the sound", "system"),
+    ("what time is it", "system"), ("what's the date today", "system"), ("what is my ip", "system"),
+    ("lock the screen", "system"), ("screenshot", "system"), ("minimize everything", "system"),
+    ("turn it up a bit", "system"), ("shut down the computer", "system"),
+    ("open spotify", "open"), ("launch chrome", "open"), ("start visual studio code", "open"),
+    ("open up the calculator", "open"), ("run notepad", "open"), ("can you open discord please", "open"),
+    ("take a note: buy milk", "note"), ("note that the meeting moved to 5pm", "note"),
+    ("write a note call mom tomorrow", "note"), ("remember that I parked on level 3", "note"),
+    ("make a report on quantum mechanics", "report"), ("research the history of rome", "report"),
+    ("open the website github.com", "browse"), ("go to youtube.com", "browse"),
+    ("open github.com", "browse"), ("close spotify", "kill"), ("kill chrome", "kill"),
+    ("create a folder called projects", "folder"), ("start a new folder named music", "folder"),
+    # No rule covers these: they must reach the remote router, not settle as chat
+    ("write this down call mom", "note"), ("jot down buy eggs", "note"),
+    ("did i write anything down about groceries", "recall"), ("look up the weather in Paris", "search"),
+    ("find me a recipe for pancakes", "search"), ("what reports are running", "job"),
+    # Look like "open X" but are chat: the name is not an installed app, so they must not settle locally
+    ("start over", "chat"), ("run it again", "chat"), ("start talking", "chat"),
+    ("open up about your feelings", "chat"), ("open the door", "chat"), ("start the timer", "chat"),
+]
+# Stands in for the app index (core/apps.py): exact installed names only
+APPS = {"spotify", "chrome", "visual studio code", "calculator", "notepad", "discord"}
+
+if __name__ == "__main__":
+    for use_vectors in (False, True):
+        result = benchmark(CASES, IntentRouter(use_vectors=use_vectors, is_app=lambda name: name in APPS))
+        print(json.dumps(result, indent=2))
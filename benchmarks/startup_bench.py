@@ -0,0 +1,67 @@
+"""
+Startup benchmark: import time of core.brain and time to the first usable reply.
+Run from the repo root:  python -m benchmarks.startup_bench
+Exits non-zero when a number is over its budget, so it can gate a commit.
+The reply measurement needs Ollama running with MODEL_NAME pulled.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+IMPORT_BUDGET_S = 0.35
+FIRST_REPLY_BUDGET_S = 10.0
+RUNS = 3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import core.brain; print(time.perf_counter() - t)"
+
+REPLY_PROBE = textwrap.dedent("""
+    import os, threading, time
+    t0 = time.perf_counter()
+    import core.voice
+    core.voice.TTS_BACKEND = "offline"
+    from core.brain import Brain
+    first_chunk = threading.Event()
+    class NullWindow:
+        def evaluate_js(self, js):
+            if '"chunk"' in js: first_chunk.set()
+    brain = Brain(NullWindow())
+    brain.submit_input("hi")
+    print(time.perf_counter() - t0 if first_chunk.wait(120) else -1, flush=True)
+    os._exit(0)
+""")
+
+def probe(code):
+    # Fresh interpreter per run (cold imports) in a scratch dir, so the real
+    # conversation store and caches are never touched
+    with tempfile.TemporaryDirectory() as cwd:
+        os.makedirs(os.path.join(cwd, "core"))
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                             capture_output=True, text=True, timeout=300)
+        try: return float(out.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            print(out.stderr[-2000:], file=sys.stderr)
+            return None
+
+def run():
+    imports = [probe(IMPORT_PROBE) for _ in range(RUNS)]
+    import_s = min(t for t in imports if t is not None) if any(t is not None for t in imports) else None
+    reply_s = probe(REPLY_PROBE)
+    if reply_s is not None and reply_s < 0: reply_s = None
+    result = {
+        "import_s": import_s, "import_budget_s": IMPORT_BUDGET_S,
+        "first_reply_s": reply_s, "first_reply_budget_s": FIRST_REPLY_BUDGET_S,
+    }
+    result["passed"] = (import_s is not None and import_s <= IMPORT_BUDGET_S
+                        and (reply_s is None or reply_s <= FIRST_REPLY_BUDGET_S))
+    return result
+
+if __name__ == "__main__":
+    result = run()
+    print(json.dumps(result, indent=2))
+    if result["first_reply_s"] is None: print("[Bench] No reply measured (is Ollama running?)")
+    sys.exit(0 if result["passed"] else 1)
@@ -0,0 +1,64 @@
+"""
+Fuzz + throughput check for the streaming tag parser (core/tags.py).
+Any chunking of a stream must give the same text and commands as parsing it whole,
+and the whole-string result must match a simple regex reference.
+Run from the repo root:  python -m benchmarks.tags_bench
+"""
+import json
+import random
+import re
+import sys
+import time
+from core.tags import TagParser, parse_tags, SIMPLE_TAGS, ARG_TAGS
+
+PIECES = ["Sure thing! ", "Turning it up. ", "ok ", "[laughs] ", "[", "]", "[[", "a]b", "\n",
+          "Here you go: ", "[vol_up] ", "[TYPE: hello World]", "[OPEN:spotify]", "[open:]",
+          "[UNKNOWN]", "[MUTE", "[type:x] [type:y]"] + [f"[{t}]" for t in SIMPLE_TAGS]
+
+def reference(text):
+    """Regex reference: innermost [..] spans (no nested '['), resolved like TagParser."""
+    commands = []
+    def repl(m):
+        name, sep, arg = m.group(1).partition(':')
+        name, arg = name.strip().upper(), arg.strip()
+        if not sep and name in SIMPLE_TAGS: commands.append(SIMPLE_TAGS[name])
+        elif sep and name in ARG_TAGS and arg: commands.append({"cmd": ARG_TAGS[name], "content": arg})
+        else: return m.group(0)
+        return ""
+    return re.sub(r'\[([^\[\]]*)\]', repl, text), commands
+
+def stream(text, rng):
+    parser, out, commands, i = TagParser(), [], [], 0
+    while i < len(text):
+        n = rng.randint(1, 12)  # Ollama chunks are a token or a few
+        clean, found = parser.feed(text[i:i + n])
+        out.append(clean)
+        commands += found
+        i += n
+    out.append(parser.flush())
+    return "".join(out), commands
+
+def fuzz(rounds=3000, seed=7):
+    rng = random.Random(seed)
+    for r in range(rounds):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 40)))
+        whole = parse_tags(text)
+        if stream(text, rng) != whole: return {"ok": False, "round": r, "text": text}
+        if whole != reference(text): return {"ok": False, "round": r, "text": text, "reference": True}
+    return {"ok": True, "rounds": rounds}
+
+def throughput(chars=2_000_000, seed=11):
+    rng = random.Random(seed)
+    text = "".join(rng.choice(PIECES) for _ in range(chars // 8))
+    chunks = [text[i:i + 6] for i in range(0, len(text), 6)]
+    parser, commands = TagParser(), 0
+    start = time.perf_counter()
+    for chunk in chunks: commands += len(parser.feed(chunk)[1])
+    elapsed = time.perf_counter() - start
+    return {"chars": len(text), "chunks": len(chunks), "commands": commands,
+            "us_per_chunk": round(elapsed / len(chunks) * 1e6, 2), "mb_per_s": round(len(text) / elapsed / 1e6, 1)}
+
+if __name__ == "__main__":
+    result = {"fuzz": fuzz(), "throughput": throughput()}
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["fuzz"]["ok"] else 1)
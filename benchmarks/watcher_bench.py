@@ -0,0 +1,66 @@
+"""
+Scenario check for the focus watcher (core/watcher.py), driven by FakeSource and a fake clock.
+Each scenario replays timed focus changes, polls like the tick thread and compares the
+windows Luna reacted to against what debounce, dwell and recent-title suppression allow.
+A long random session then shows how many raw focus events reach the LLM.
+Run from the repo root:  python -m benchmarks.watcher_bench
+"""
+import json
+import random
+import sys
+from core.watcher import FakeSource, WindowWatcher, DEBOUNCE_SECONDS, DWELL_SECONDS, RECENT_TTL
+
+TICK = 0.25
+CODE, MAIL, TUBE = "Visual Studio Code - main.py", "(3) Inbox - Gmail", "YouTube - Lofi beats"
+
+# (name, [(seconds, title), ...], run until, titles that must fire in order)
+SCENARIOS = [
+    ("dwell", [(0, CODE)], DWELL_SECONDS + 1, [CODE]),
+    ("too short to dwell", [(0, CODE), (DWELL_SECONDS - 1, MAIL)], DWELL_SECONDS + 0.5, []),
+    # Alt-tab cycling: each stop is shorter than the debounce, so CODE keeps its dwell timer
+    ("alt-tab keeps dwell", [(0, CODE), (5, MAIL), (5.2, TUBE), (5.4, CODE)], DWELL_SECONDS + 1, [CODE]),
+    ("alt-tab lands elsewhere", [(0, CODE), (5, MAIL), (5.2, TUBE)], 5.2 + DWELL_SECONDS + 1, [TUBE]),
+    ("fires once per visit", [(0, CODE)], 3 * DWELL_SECONDS, [CODE]),
+    # "(3) Inbox" and "(4) Inbox" are the same window
+    ("recent title skipped", [(0, MAIL), (10, CODE), (20, "(4) Inbox - Gmail")], 30, [MAIL, CODE]),
+    ("recent title expires", [(0, MAIL), (10, CODE), (20 + RECENT_TTL, MAIL)], 30 + RECENT_TTL, [MAIL, CODE, MAIL]),
+]
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def __call__(self): return self.now
+
+def replay(events, until):
+    clock, source, fired = FakeClock(), FakeSource(), []
+    watcher = WindowWatcher(source, on_dwell=fired.append, clock=clock)
+    source.start(watcher.on_focus)  # no tick thread: poll() below stands in for it
+    events = sorted(events)
+    while clock.now <= until:
+        while events and events[0][0] <= clock.now: source.emit(events.pop(0)[1])
+        watcher.poll()
+        clock.now = round(clock.now + TICK, 6)
+    return fired, watcher.counts
+
+def check():
+    failures = []
+    for name, events, until, expected in SCENARIOS:
+        fired, _ = replay(events, until)
+        if fired != expected: failures.append({"scenario": name, "expected": expected, "fired": fired})
+    return {"ok": not failures, "scenarios": len(SCENARIOS), "failures": failures}
+
+def session(hours=8, seed=3):
+    """Bursts of quick switching between a handful of windows, with longer stays in between."""
+    rng = random.Random(seed)
+    titles = [f"({n}) Inbox - Gmail" for n in range(1, 9)] + [CODE, TUBE, "Terminal", "Slack - general",
+                                                               "Spotify Premium", "Docs - notes"]
+    events, t = [], 0.0
+    while t < hours * 3600:
+        t += rng.expovariate(1 / 40) if rng.random() < 0.3 else rng.uniform(0.1, 2 * DEBOUNCE_SECONDS)
+        events.append((round(t, 2), rng.choice(titles)))
+    fired, counts = replay(events, hours * 3600)
+    return {"hours": hours, **counts, "per_hour": round(len(fired) / hours, 1)}
+
+if __name__ == "__main__":
+    result = {"check": check(), "session": session()}
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["check"]["ok"] else 1)
@@ -0,0 +1,287 @@
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from core.lazy import LazyModule
+
+np = LazyModule("numpy", optional=True)
+
+APPS_FILE = "core/apps.json"
+INDEX_VERSION = 2
+MIN_SCORE = 0.45       # trigram similarity a fuzzy match needs to be launched
+REFRESH_INTERVAL = 60  # seconds; a miss rescans (changed directories only) at most this often
+SHORTLIST = 16         # best trigram overlaps re-scored with the prefix bonus
+# Spoken names -> what the app is actually called
+ALIASES = {"google": "chrome", "google chrome": "chrome", "vscode": "code", "vs code": "code"}
+if os.name == "nt": ALIASES["terminal"] = "cmd"
+# Targets that are URIs, not programs (Windows settings pages and the like)
+URI_APPS = {"settings": "ms-settings:"} if os.name == "nt" else {}
+# PATH programs that are never "an app to open": power, privilege and disk tools
+BLOCKED = frozenset("""
+shutdown poweroff reboot halt init telinit systemctl loginctl logout chroot sudo su doas pkexec runas
+kill killall pkill taskkill rm shred dd fdisk parted mkfs diskpart format bcdedit bootcfg reg sc netsh
+""".split())
+FIELD_CODE = re.compile(r"%[a-zA-Z]")  # .desktop Exec placeholders (%u, %F, ...)
+WORD = re.compile(r"[a-z0-9+]+")
+
+def normalize(name):
+    return " ".join(WORD.findall(name.lower()))
+
+def trigrams(text):
+    t = f"  {text} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+# --- SOURCES ---
+# Each scanner reads one directory's files into (name, target, kind, also) apps;
+# `also` is an extra name to match on (e.g. the executable behind a shortcut).
+def _scan_path_dir(path):
+    """Executables on PATH; matched by exact name only (see AppIndex)."""
+    exts = os.environ.get("PATHEXT", ".EXE;.BAT;.CMD").lower().split(";") if os.name == "nt" else None
+    apps = []
+    for entry in os.scandir(path):
+        try:
+            if not entry.is_file(): continue
+            stem, ext = os.path.splitext(entry.name)
+            if exts is not None:
+                if ext.lower() in exts and stem.lower() not in BLOCKED: apps.append((stem, entry.path, "exe", None))
+            elif entry.name not in BLOCKED and os.access(entry.path, os.X_OK):
+                apps.append((entry.name, entry.path, "exe", None))
+        except OSError: continue
+    return apps
+
+def _parse_desktop(path):
+    fields, section = {}, None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("["): section = line
+            elif section == "[Desktop Entry]" and "=" in line:
+                key, value = line.split("=", 1)
+                fields.setdefault(key.strip(), value.strip())
+    if fields.get("Type", "Application") != "Application" or not fields.get("Exec"): return None
+    if fields.get("NoDisplay") == "true" or fields.get("Hidden") == "true": return None
+    command = FIELD_CODE.sub("", fields["Exec"]).strip()
+    try: binary = os.path.basename(shlex.split(command)[0])
+    except (ValueError, IndexError): return None
+    return (fields.get("Name") or binary, command, "desktop", binary)
+
+def _scan_desktop_dir(path):
+    apps = []
+    for entry in os.scandir(path):
+        if not entry.name.endswith(".desktop"): continue
+        try: app = _parse_desktop(entry.path)
+        except OSError: continue
+        if app: apps.append(app)
+    return apps
+
+def _scan_shortcut_dir(path):
+    """Start-menu shortcuts (.lnk, .url) and macOS bundles (.app): launched by the OS shell."""
+    apps = []
+    for entry in os.scandir(path):
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() in (".lnk", ".url", ".app"):
+            apps.append((stem, entry.path, "shell", None))
+    return apps
+
+def default_sources():
+    """(directory, scanner, recursive) for this platform; PATH is always included, except sbin directories."""
+    path = [d for d in dict.fromkeys(os.environ.get("PATH", "").split(os.pathsep))
+            if d and os.path.basename(os.path.normpath(d)) != "sbin"]
+    sources = [(d, _scan_path_dir, False) for d in path]
+    home = os.path.expanduser("~")
+    if os.name == "nt":
+        for root in (os.environ.get("ProgramData"), os.environ.get("APPDATA")):
+            if root: sources.append((os.path.join(root, "Microsoft", "Windows", "Start Menu", "Programs"),
+                                     _scan_shortcut_dir, True))
+    elif sys.platform == "darwin":
+        for d in ("/Applications", "/System/Applications", os.path.join(home, "Applications")):
+            sources.append((d, _scan_shortcut_dir, False))
+    else:
+        data_dirs = os.environ.get("XDG_DATA_DIRS", "/usr/local/share:/usr/share").split(":")
+        data_dirs = [os.environ.get("XDG_DATA_HOME", os.path.join(home, ".local", "share"))] + data_dirs
+        data_dirs.append("/var/lib/flatpak/exports/share")
+        for d in dict.fromkeys(data_dirs): sources.append((os.path.join(d, "applications"), _scan_desktop_dir, True))
+    return sources
+
+# --- MATCHING ---
+class AppIndex:
+    """
+    Name lookup over a catalog of apps. Every name (and alternate name) is
+    broken into character trigrams once, into a trigram -> names table;
+    a query only touches the names that share a trigram with it. With NumPy
+    the overlap counts are one bincount instead of a Python loop.
+    Bare PATH executables are matched by exact name only: "chrome" must not
+    become chroot, nor "timer" timeout.
+    """
+    def __init__(self, apps):
+        self.apps = apps
+        self.keys = []    # (normalized name, app index)
+        self.exact = {}   # normalized name -> app index (first one wins: shortcuts before PATH)
+        self.table = {}   # trigram -> [key index]
+        self.sizes = []   # trigram count per key
+        for i, (name, target, kind, also) in enumerate(apps):
+            for key in {normalize(name), normalize(also or "")}:
+                if not key: continue
+                if kind == "exe":
+                    self.exact.setdefault(key, i)
+                    continue
+                k = len(self.keys)
+                self.keys.append((key, i))
+                self.exact.setdefault(key, i)
+                grams = trigrams(key)
+                self.sizes.append(len(grams))
+                for g in grams: self.table.setdefault(g, []).append(k)
+        if np:
+            self.table = {g: np.asarray(ks, dtype=np.int32) for g, ks in self.table.items()}
+            self.sizes = np.asarray(self.sizes, dtype=np.float32)
+
+    def _overlaps(self, grams):
+        """[(key index, shared trigram count)] for the keys sharing the most trigrams."""
+        lists = [self.table[g] for g in grams if g in self.table]
+        if not lists: return []
+        if np:
+            shared = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+            dice = 2 * shared / (len(grams) + self.sizes)
+            top = np.argpartition(-dice, SHORTLIST)[:SHORTLIST] if len(dice) > SHORTLIST else np.arange(len(dice))
+            return [(int(k), int(shared[k])) for k in top if shared[k]]
+        shared = Counter()
+        for ks in lists: shared.update(ks)
+        return list(shared.items())
+
+    def match(self, name):
+        """Returns (app, score) for the best match, or (None, score) below MIN_SCORE."""
+        query = normalize(name)
+        if not query: return None, 0.0
+        if query in self.exact: return self.apps[self.exact[query]], 1.0
+        grams = trigrams(query)
+        best, best_rank = None, (0.0, 0)
+        for k, n in self._overlaps(grams):
+            # Dice coefficient, with a nudge for names that start with what was said ("spot" -> "spotify");
+            # ties go to the shorter name
+            score = 2 * n / (len(grams) + self.sizes[k]) + (0.15 if self.keys[k][0].startswith(query) else 0)
+            rank = (float(score), -len(self.keys[k][0]))
+            if rank > best_rank: best, best_rank = k, rank
+        if best is None or best_rank[0] < MIN_SCORE: return None, best_rank[0]
+        return self.apps[self.keys[best][1]], min(1.0, best_rank[0])
+
+class AppResolver:
+    """
+    Finds and launches installed apps by spoken name. The index of launchable
+    apps is cached in core/apps.json per directory with its mtime, so a
+    refresh only rescans directories whose contents changed.
+    """
+    def __init__(self, path=APPS_FILE, sources=None):
+        self.path = path
+        self.sources = sources
+        self.index = None
+        self._dirs = None  # directory -> {"mtime", "apps"}
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    # --- INDEX ---
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+            if data.get("version") == INDEX_VERSION: return data["dirs"]
+        except (OSError, ValueError, KeyError): pass
+        return {}
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f: json.dump({"version": INDEX_VERSION, "dirs": self._dirs}, f)
+            os.replace(tmp, self.path)
+        except OSError as e: print(f"[Apps] Could not save index: {e}")
+
+    def _scan(self, directory, scanner, recursive, seen):
+        """Rescans directory if its mtime moved; returns True if anything changed."""
+        try: mtime = os.stat(directory).st_mtime
+        except OSError: return False
+        seen.add(directory)
+        changed = False
+        cached = self._dirs.get(directory)
+        if cached is None or cached["mtime"] != mtime:
+            try: apps = scanner(directory)
+            except OSError: apps = []
+            self._dirs[directory] = {"mtime": mtime, "apps": [list(a) for a in apps]}
+            changed = True
+        if recursive:
+            try: subdirs = [e.path for e in os.scandir(directory) if e.is_dir() and not e.name.endswith(".app")]
+            except OSError: subdirs = []
+            for d in subdirs: changed = self._scan(d, scanner, recursive, seen) or changed
+        return changed
+
+    def refresh(self):
+        """Brings the index up to date with the disk; cheap when nothing changed (a stat per directory)."""
+        with self._lock:
+            if self._dirs is None: self._dirs = self._load()
+            seen = set()
+            changed = False
+            for directory, scanner, recursive in (self.sources or default_sources()):
+                changed = self._scan(directory, scanner, recursive, seen) or changed
+            for gone in set(self._dirs) - seen:
+                del self._dirs[gone]
+                changed = True
+            if changed or self.index is None:
+                # Start-menu and .desktop entries before PATH binaries: their names are the friendly ones
+                apps = [tuple(a) for d in self._dirs.values() for a in d["apps"]]
+                apps.sort(key=lambda a: a[2] == "exe")
+                self.index = AppIndex(apps)
+            if changed: self._save()
+            self._refreshed = time.monotonic()
+            return len(self.index.apps)
+
+    def resolve(self, name):
+        """(name, target, kind) of the installed app best matching name, or None."""
+        query = ALIASES.get(normalize(name), name)
+        if self.index is None: self.refresh()
+        app, _ = self.index.match(query)
+        if app is None and time.monotonic() - self._refreshed > REFRESH_INTERVAL:
+            self.refresh()  # maybe it was just installed
+            app, _ = self.index.match(query)
+        return app
+
+    def knows(self, name):
+        """True if name is an alias or exactly the name of an installed app (no fuzzy matching)."""
+        key = normalize(name)
+        if key in ALIASES or key in URI_APPS: return True
+        if self.index is None: self.refresh()
+        return key in self.index.exact
+
+    # --- LAUNCH ---
+    def launch(self, app):
+        """Starts the app detached from Luna. Returns False if it could not be started."""
+        name, target, kind, _ = app
+        try:
+            if kind == "shell":
+                if os.name == "nt": os.startfile(target)
+                else: subprocess.Popen(["open", target], **_detached())
+            else:
+                args = [target] if kind == "exe" else shlex.split(target)
+                subprocess.Popen(args, **_detached())
+            print(f"[Apps] Launched {name} ({target})")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"[Apps] Launch failed for {name}: {e}")
+            return False
+
+    def open(self, name):
+        """Launches by spoken name; returns the app's name, or None to fall back to the Start menu."""
+        uri = URI_APPS.get(normalize(name))
+        if uri:
+            os.startfile(uri)
+            return name
+        app = self.resolve(name)
+        if app and self.launch(app): return app[0]
+        return None
+
+def _detached():
+    kw = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL, "close_fds": True}
+    if os.name == "nt": kw["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else: kw["start_new_session"] = True
+    return kw
@@ -1,29 +1,98 @@
 import time
-import random
-import threading
-import json
-import os
-import re
-import ollama
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from core.voice import VoiceEngine
 from core.skills import SkillSet
+from core.speech import SpeechPipeline, MutedSpeech, SentenceSplitter, split_sentences
+from core.ui_bridge import UIBridge
+from core.speculation import BackgroundStream, SpeculationStats
+from core.scheduler import TurnScheduler, CancelToken, PRIORITY_USER, PRIORITY_SKILL, PRIORITY_AUTONOMY
+from core.context import ContextManager, SUMMARY_FILE
+from core.llm import LLMSession, Preempted
+from core.store import ConversationStore
+from core.watcher import WindowWatcher, create_source
+from core.startup import StagedStartup
+from core.tags import TagParser
+from core.tracing import TRACER
+from core.jobs import JOB_OWNER
 
 MODEL_NAME = "hermes3"  # Ensure this matches your installed model
-AUTONOMY_INTERVAL = 40
-MEMORY_FILE = "core/memory.json"
+# Window comments go to a small model with a trimmed context (`ollama pull llama3.2:1b`).
+# None sends them to MODEL_NAME; so does a small model that fails to load.
+SMALL_MODEL = "llama3.2:1b"
+SMALL_OPTIONS = {"num_ctx": 2048}
+AUTONOMY_BUDGET = 800  # context tokens for a window comment (the full window is CONTEXT_BUDGET)
+WORKING_WINDOW = 40  # messages loaded into RAM at startup; the rest stays on disk
+SPECULATIVE_CHAT = True  # Start the chat reply while the router is still deciding
+LLM_LOAD_TIMEOUT = 120  # seconds to wait for the model before marking chat as failed
+RECALL_TIMEOUT = 0.25   # seconds a reply waits for long-term memories before going without them
 
 class Brain:
-    def __init__(self, window):
+    """
+    One conversation. With session=None it is the desktop session: it speaks,
+    keeps persistent history and long-term memory, and watches the focused
+    window. Server sessions (session="<id>") share the model connection and
+    skills but keep their own in-memory history. UI ops go to `sink`
+    (see core/server.py), or to `window` directly when no sink is given.
+    """
+    def __init__(self, window=None, llm=None, ui_ready=None, sink=None, skills=None, session=None, speak=None,
+                 quick=None):
         self.window = window
+        self.session = session
+        primary = session is None
+        self.llm = llm or LLMSession(MODEL_NAME)
+        # Small-model tier for autonomy; only the desktop session has autonomy
+        self.quick = quick or (LLMSession(SMALL_MODEL, tier="small", options=SMALL_OPTIONS)
+                               if primary and SMALL_MODEL else None)
+        self.ui = UIBridge(window, ready=ui_ready, sink=sink)
         self.active = True
-        self.voice = VoiceEngine()
-        self.skills = SkillSet()
-        self.last_window = ""
+        # Constructors below are cheap; heavy backends load in parallel startup stages
+        # (or on first use), and the UI shows each one's readiness.
+        speak = primary if speak is None else speak
+        self.voice = VoiceEngine() if speak else None
+        self.speech = (SpeechPipeline(self.voice, on_start=self._on_speech_start, on_idle=self._on_speech_idle)
+                       if speak else MutedSpeech())
+        self.skills = skills or SkillSet()
+        if skills is None: self.skills.jobs.on_done = self._on_job_done  # shared skills: the server routes jobs
+        self.watcher = (WindowWatcher(create_source(self.skills.get_active_window), on_dwell=self._on_window_settled)
+                        if primary else None)
+        self.context = ContextManager(summarize=self._summarize, path=SUMMARY_FILE if primary else None)
+        self.store = ConversationStore() if primary else None
+        self.memory = None  # semantic memory; set when its startup stage finishes
         self.history = self._load_memory()
+        self.startup = StagedStartup(on_change=self.ui.subsystem)
+        self.startup.start("chat", lambda: self.llm.wait_ready(LLM_LOAD_TIMEOUT))
+        if self.voice: self.startup.start("voice", self.voice.warm)
+        self.startup.start("skills", self.skills.warm)
+        if primary:
+            self.startup.start("memory", self._build_memory)
+            self.startup.when_ready("memory", lambda memory: setattr(self, 'memory', memory))
+        self.speculative = SPECULATIVE_CHAT
+        self.spec_stats = SpeculationStats()
+        # Every turn (user or autonomy) runs on the scheduler's single worker
+        self.scheduler = TurnScheduler()
+        self.command_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="commands")
+        # Two workers: a lookup abandoned at RECALL_TIMEOUT must not hold up the next turn's
+        self.recall_runner = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recall")
+
+    def submit_input(self, user_text):
+        """
+        Queues a user message; it interrupts whatever Luna is doing (barge-in).
+        Returns the turn's CancelToken (its id tags the turn's begin/complete ops), or None if the queue is full.
+        """
+        self.speech.stop()  # silence at once, even if the previous turn has already handed off its audio
+        return self.scheduler.submit(PRIORITY_USER, self.process_input, user_text, barge_in=True,
+                                     on_skip=self._skipped_input)
+
+    def _skipped_input(self, cancel):
+        # Barged in on before it started: still open and close the turn, so clients waiting on it finish
+        self.ui.begin(cancel.id)
+        self.ui.complete(cancel.id)
 
     def start_life(self):
-        thread = threading.Thread(target=self._life_loop, daemon=True)
-        thread.start()
+        if not self.watcher: return
+        if self.quick: self.quick.warm_async()
+        print("[Brain] Autonomy Watcher Started")
+        self.watcher.start()
 
     def _load_memory(self):
         system_prompt = (
@@ -37,143 +106,269 @@ class Brain:
             "4. Make the user comfortable around you"
             "If the System tells you 'Action Executed', confirm it enthusiastically to the user."
         )
-        if os.path.exists(MEMORY_FILE):
-            try:
-                with open(MEMORY_FILE, 'r') as f:
-                    h = json.load(f)
-                    h[0]['content'] = system_prompt
-                    return h
-            except: pass
-        return [{'role': 'system', 'content': system_prompt}]
+        # Only the working window lives in RAM; older turns are already in the summary
+        h = [{'role': 'system', 'content': system_prompt}] + (self.store.recent(WORKING_WINDOW) if self.store else [])
+        return self.context.trim(h, fold=False)
+
+    def _remember(self, message):
+        """Adds a message to the working window and queues it for disk (write-behind)."""
+        with TRACER.span("memory.append", role=message['role']):
+            self.history.append(message)
+            if self.store: self.store.append(message)
+        if message['role'] in ('user', 'assistant'):
+            # Queued until the memory stage is up, so early turns are not lost
+            self.startup.when_ready("memory", lambda memory: memory.add_async(message['content'], kind=message['role']))
+
+    def _build_memory(self):
+        from core.semantic_memory import MemoryIndex, create_embedder  # NumPy: keep it off the import path
+        return MemoryIndex(create_embedder())
+
+    def _recall(self, text, timeout=RECALL_TIMEOUT):
+        """
+        Long-term memories related to `text` that are not already in the working window.
+        The lookup is an embedding call, so it runs on its own thread and the reply
+        goes without memories rather than wait past `timeout`.
+        """
+        if self.memory is None: return []
+        in_window = {m['content'] for m in self.history}
+        pending = self.recall_runner.submit(self.memory.recall, text, in_window)
+        try:
+            return [entry['text'][:300] for _, entry in pending.result(timeout)]
+        except FutureTimeout:
+            print(f"[Memory] Recall took over {timeout * 1000:.0f} ms, replying without it")
+        except Exception as e:
+            print(f"[Memory] Recall failed: {e}")
+        return []
 
     def _save_memory(self):
-        # Keep history from getting too large (last 20 messages)
-        if len(self.history) > 20:
-            self.history = [self.history[0]] + self.history[-19:]
-        try: 
-            with open(MEMORY_FILE, 'w') as f: json.dump(self.history, f)
-        except: pass
+        # Keep history within the token budget; older turns go into the summary.
+        # Nothing to write here: every message was already queued by _remember.
+        with TRACER.span("memory.save"): self.history = self.context.trim(self.history)
+
+    def older_messages(self, before_id=None, limit=50, conversation=None):
+        """Pages back through past sessions on disk, newest first."""
+        return self.store.page(before_id, limit, conversation) if self.store else []
+
+    def conversations(self, limit=20, offset=0):
+        """Past sessions on disk, newest first (ids to pass to older_messages)."""
+        return self.store.sessions(limit, offset) if self.store else []
+
+    def metrics(self):
+        """This session's numbers for GET /metrics."""
+        return {"speculation": self.spec_stats.report(), "scheduler": self.scheduler.metrics(),
+                "context": self.context.stats()}
+
+    def shutdown(self):
+        """Stops this conversation and its threads (the shared LLM and skills stay up)."""
+        self.active = False
+        self.scheduler.close()
+        self.speech.close()
+        if self.watcher: self.watcher.stop()
+        self.context.close()
+        self.command_runner.shutdown(wait=False)
+        self.recall_runner.shutdown(wait=False)
+        self.ui.close()
+        if self.store: self.store.close()
+
+    def _summarize(self, summary, dropped):
+        """Folds turns that left the context window into the running summary (background)."""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        prompt = (
+            "Update this summary of a conversation between the user and Luna with the new lines. "
+            "Keep names, facts, preferences and promises. Reply with the summary only, under 150 words.\n\n"
+            f"SUMMARY SO FAR: {summary or '(empty)'}\n\nNEW LINES:\n{transcript}"
+        )
+        response = self.llm.chat([{'role': 'user', 'content': prompt}], kind="summary")
+        return response['message']['content']
 
     # --- AUTONOMY & VISION ---
-    def _life_loop(self):
-        print("[Brain] Autonomy Loop Started")
-        while self.active:
-            time.sleep(AUTONOMY_INTERVAL)
-            
-            # Check what user is doing
-            current_window = self.skills.get_active_window()
-            
-            # Trigger if window changed OR 20% random chance
-            if current_window != self.last_window or random.random() < 0.2:
-                self.last_window = current_window
-                self._trigger_curiosity(current_window)
+    def _on_window_settled(self, window_title):
+        # The watcher already debounced, waited out the dwell time and skipped repeats
+        if self.active: self.scheduler.submit(PRIORITY_AUTONOMY, self._trigger_curiosity, window_title)
+
+    def _trigger_curiosity(self, window_title, cancel=None):
+        # Don't comment on yourself
+        if not window_title or "Luna" in window_title or "AI" in window_title: return
+        self._react(f"[SYSTEM EVENT: User is looking at window '{window_title}'. React to this playfully.]",
+                    cancel, kind="autonomy")
+
+    def _on_skill_done(self, intent, result):
+        # A background skill (e.g. a report) finished after the reply moved on
+        print(f"[Skill] {intent.get('action')} finished: {result}")
+        if self.active: self.scheduler.submit(PRIORITY_SKILL, self._report_skill, intent, result)
+
+    def _on_job_done(self, job):
+        # Background jobs (reports, searches) post their outcome into the conversation
+        self.ui.job(job)
+        if self.active and job['state'] != "cancelled":
+            self.scheduler.submit(PRIORITY_SKILL, self._report_job, job)
+
+    def _report_job(self, job, cancel=None):
+        result = str(job['result'])[:1500]  # a search answer can be long; the gist is enough
+        self._react(f"[SYSTEM EVENT: Background {job['kind']} job #{job['id']} for '{job['target']}' "
+                    f"{job['state']}: {result}. Tell the user briefly.]", cancel, kind="skill")
 
-    def _trigger_curiosity(self, window_title):
+    def _report_skill(self, intent, result, cancel=None):
+        self._react(f"[SYSTEM EVENT: The '{intent.get('action')}' task for '{intent.get('target')}' "
+                    f"finished: {result}. Tell the user briefly.]", cancel, kind="skill")
+
+    def _react(self, event, cancel=None, kind="autonomy"):
         """
-        FIXED: Now adds the observation and response to history
-        so the AI remembers what it commented on.
+        Luna's reply to something she noticed (`kind` "autonomy": a window comment on the
+        small model) or was told (a finished skill or job, on the main model). The event and
+        her reply go into history, so she remembers what she already commented on.
         """
+        cancel = cancel or CancelToken()
+        TRACER.new_turn()
+        JOB_OWNER.set(self.session)
         try:
-            # Don't comment on yourself
-            if not window_title or "Luna" in window_title or "AI" in window_title: return
-
-            # 1. Add the OBSERVATION to history
-            observation_msg = f"[SYSTEM EVENT: User is looking at window '{window_title}'. React to this playfully.]"
-            self.history.append({'role': 'system', 'content': observation_msg})
+            # 1. The OBSERVATION (only kept in history if she gets to react)
+            observation = {'role': 'system', 'content': event}
 
-            if self.window: self.window.evaluate_js("setStatus('thinking')")
+            self.ui.status('thinking')
             
-            # 2. Generate response using FULL history (so she remembers context)
-            response = ollama.chat(model=MODEL_NAME, messages=self.history)
+            # 2. Generate the response. Window comments use the small model and a trimmed
+            # window (summary + latest turns); reports of finished tasks use the full one.
+            llm, budget = self.llm, None
+            if kind == "autonomy":
+                budget = AUTONOMY_BUDGET
+                if self.quick and self.quick.usable: llm = self.quick
+            with TRACER.span("llm.chat", kind=kind, tier=llm.tier):
+                response = llm.chat(self.context.window(self.history + [observation], budget=budget), kind, cancel)
             ai_text = response['message']['content']
+            # The user said something meanwhile: their turn wins, drop the quip
+            if cancel.cancelled: return
             
-            # 3. Add her RESPONSE to history
-            self.history.append({'role': 'assistant', 'content': ai_text})
+            # 3. Add the observation and her RESPONSE to history
+            self._remember(observation)
+            self._remember({'role': 'assistant', 'content': ai_text})
             self._save_memory()
             
             # 4. Output
             if len(ai_text) > 2:
                 self._send_to_ui(ai_text)
-                self._speak(ai_text)
+                self._speak(ai_text, cancel)
                 
-        except Exception as e: print(f"Autonomy error: {e}")
+        except Preempted: print(f"[Brain] {kind} reaction dropped for a user turn")
+        except Exception as e: print(f"[Brain] {kind} reaction failed: {e}")
 
     # --- INTERACTION ---
-    def process_input(self, user_text):
+    def process_input(self, user_text, cancel=None):
         print(f"[User] {user_text}")
-        if self.window: self.window.evaluate_js("setStatus('thinking')")
+        TRACER.new_turn()
+        JOB_OWNER.set(self.session)  # jobs started by this turn report back to this session
+        cancel = cancel or CancelToken()
+        cancel.on_cancel(self.speech.stop)
+        self.ui.begin(cancel.id)
+        self.ui.status('thinking')
 
         context = ""
-        
-        # 1. INTELLIGENT ROUTING (Gemini)
-        # Uses the Gemini Router from your new skills.py
-        intent = self.skills.analyze_intent(user_text)
+        started = time.perf_counter()
+        with TRACER.span("memory.recall"): memories = self._recall(user_text)
+
+        # 0. SPECULATION: most messages are chat, so start generating now.
+        # Tokens are buffered (not shown or spoken) until the router agrees.
+        speculative = None
+        if self.speculative:
+            messages = self.context.window(self.history + [{'role': 'user', 'content': user_text}], memories)
+            speculative = self._start_stream(messages)
+
+        # 1. INTELLIGENT ROUTING (local fast path, Gemini fallback)
+        with TRACER.span("route"): intent = self.skills.analyze_intent(user_text)
+        wasted = False
         
         if intent['action'] != 'chat':
-            result = self.skills.execute_intent(intent)
+            if speculative:
+                speculative.cancel()
+                speculative, wasted = None, True
+            with TRACER.span("skill", action=intent['action']):
+                result = self.skills.execute_intent(intent, on_done=self._on_skill_done)
+            self.ui.skill(intent['action'], result)
             context += f"\n[SYSTEM: Action Executed: {result}]"
+            if intent['action'] == 'note' and intent.get('target'):
+                self.startup.when_ready("memory", lambda memory: memory.add_async(intent['target'], kind='note'))
 
         # 2. Add User Input to History
-        self.history.append({'role': 'user', 'content': user_text + context})
+        self._remember({'role': 'user', 'content': user_text + context})
+
+        if cancel.cancelled:
+            if speculative: speculative.cancel()
+            self.ui.complete(cancel.id)
+            return
 
-        # 3. Generate Response
+        # 3. Generate Response (keep the speculative tokens if routing said chat)
         full_response = ""
+        splitter = SentenceSplitter()
+        tags = TagParser()
         try:
             # Use streaming for faster feedback
-            stream = ollama.chat(model=MODEL_NAME, messages=self.history, stream=True)
-            for chunk in stream:
-                content = chunk['message']['content']
+            stream = speculative or self._start_stream(self.context.window(self.history, memories))
+            cancel.on_cancel(stream.cancel)
+            for content in stream:
+                if cancel.cancelled: break
+                if content and not full_response:
+                    self.spec_stats.record(self.speculative, time.perf_counter() - started, wasted)
                 full_response += content
-                safe_chunk = json.dumps(content)
-                self.window.evaluate_js(f"addChunk({safe_chunk})")
+                # Command tags fire as soon as they close and never reach the UI or TTS
+                text, commands = tags.feed(content)
+                if commands: self._run_commands(commands)
+                self._show_and_say(text, splitter)
+            self._show_and_say(tags.flush(), splitter)
             
-            self.window.evaluate_js("generationComplete()")
+            self.ui.complete(cancel.id)
             
-            # Add to history
-            self.history.append({'role': 'assistant', 'content': full_response})
+            self._record_prompt(stream)
+
+            # Add to history (a barged-in reply is kept as far as it got)
+            self._remember({'role': 'assistant', 'content': full_response})
             self._save_memory()
             
         except Exception as e:
             err = f"Error: {e}"
             self._send_to_ui(err)
+            self.ui.complete(cancel.id)  # the turn is over: clients waiting for 'complete' must not hang
             full_response = err
+            splitter.flush()
+            self.speech.say(err)
 
-        # 4. Handle any commands inside the response
-        self._handle_commands(full_response)
+        if cancel.cancelled: return
 
-        # 5. Speak
-        clean_text = re.sub(r'\[.*?\]', '', full_response)
-        self._speak(clean_text)
+        # 4. Speak whatever is left after the last full sentence.
+        # No waiting: playback runs on its own thread and the worker moves on.
+        for sentence in splitter.flush(): self.speech.say(sentence)
 
-    def _handle_commands(self, text):
-        actions = []
-        text = text.upper()
-        
-        # Check for simple keywords
-        keywords = {
-            "[MINIMIZE]": "minimize", "[MAXIMIZE]": "maximize", "[CLOSE]": "close",
-            "[LOCK]": "lock", "[SCREENSHOT]": "screenshot",
-            "[VOL_UP]": "vol_up", "[VOL_DOWN]": "vol_down", "[MUTE]": "mute",
-            "[BRIGHT_UP]": "bright_up", "[BRIGHT_DOWN]": "bright_down",
-            "[PLAY]": "play", "[NEXT]": "next"
-        }
-        for tag, cmd in keywords.items():
-            if tag in text: actions.append(cmd)
-
-        # Check for complex commands
-        type_match = re.search(r'\[TYPE:(.*?)\]', text, re.IGNORECASE)
-        if type_match: actions.append({"cmd": "type", "content": type_match.group(1).strip()})
-        
-        open_match = re.search(r'\[OPEN:(.*?)\]', text, re.IGNORECASE)
-        if open_match: actions.append({"cmd": "open", "content": open_match.group(1).strip()})
+    def _start_stream(self, messages):
+        return BackgroundStream(lambda: self.llm.stream(messages), messages)
 
-        self.skills.execute_actions(actions)
+    def _record_prompt(self, stream):
+        prefill = stream.final.get('prompt_eval_duration')
+        first = stream.first_token
+        TRACER.record("llm.first_token", stream.started, first)
+        # Ollama reports prefill as a duration; it ends right before the first token
+        if first and prefill: TRACER.record("llm.prefill", first - prefill / 1e9, first)
+        TRACER.record("llm.stream", first, stream.ended, tokens=stream.final.get('eval_count'))
+        self.context.record_turn(stream.messages, stream.final.get('prompt_eval_count'),
+                                 prefill / 1e9 if prefill else None)
+
+    def _show_and_say(self, text, splitter):
+        if not text: return
+        self.ui.chunk(text)
+        # Speak each sentence as soon as it is complete
+        for sentence in splitter.feed(text): self.speech.say(sentence)
+
+    def _run_commands(self, commands):
+        # One worker keeps tags in reply order without stalling the token stream
+        self.command_runner.submit(self.skills.execute_actions, commands)
 
     def _send_to_ui(self, text):
-        safe_json = json.dumps(text)
-        if self.window: self.window.evaluate_js(f"addMessage({safe_json}, 'ai')")
+        self.ui.message(text, 'ai')
+
+    def _speak(self, text, cancel=None):
+        if cancel: cancel.on_cancel(self.speech.stop)
+        for sentence in split_sentences(text): self.speech.say(sentence)
+
+    def _on_speech_start(self):
+        self.ui.status('speaking')
 
-    def _speak(self, text):
-        if self.window: self.window.evaluate_js("setStatus('speaking')")
-        self.voice.speak(text)
-        if self.window: self.window.evaluate_js("setStatus('listening')")
\ No newline at end of file
+    def _on_speech_idle(self):
+        self.ui.status('listening')
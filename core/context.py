@@ -0,0 +1,127 @@
+import json
+import os
+import queue
+import threading
+
+CONTEXT_BUDGET = 3000   # tokens for system prompt + summary + recent turns
+SUMMARY_FILE = "core/summary.json"
+CHARS_PER_TOKEN = 4     # rough average for English with llama-style tokenizers
+MESSAGE_OVERHEAD = 4    # role markers / separators per message
+LOW_WATER = 0.75        # trim to this fraction of the budget (see ContextManager.trim)
+
+def estimate_tokens(message):
+    return MESSAGE_OVERHEAD + len(message.get('content', '')) // CHARS_PER_TOKEN + 1
+
+class ContextManager:
+    """
+    Fits the conversation into a token budget. Turns that fall out of the
+    window are folded into a running summary on a background thread,
+    so summarizing never delays a reply.
+    """
+    def __init__(self, budget=CONTEXT_BUDGET, summarize=None, path=SUMMARY_FILE):
+        self.budget = budget
+        self.summarize = summarize  # fn(previous_summary, dropped_messages) -> new summary
+        self.path = path
+        self.summary = self._load()
+        self.turns = []  # recent (estimated_prompt_tokens, actual_prompt_tokens, prefill_seconds)
+        self._folds = queue.Queue()
+        threading.Thread(target=self._fold_loop, daemon=True).start()
+
+    # --- PROMPT ---
+    def window(self, history, memories=(), budget=None):
+        """
+        System prompt + summary + as many of the newest messages as fit, with
+        recalled memories just before the latest message. Everything that changes
+        per turn sits at the end, so Ollama can reuse the cached prompt prefix.
+        A smaller `budget` gives a trimmed window (for quick background calls).
+        """
+        head = [history[0]]
+        if self.summary:
+            head.append({'role': 'system', 'content': f"[EARLIER CONVERSATION SUMMARY: {self.summary}]"})
+        recall = []
+        if memories:
+            recalled = " | ".join(memories)
+            recall.append({'role': 'system', 'content': f"[RELEVANT MEMORIES FROM PAST CONVERSATIONS: {recalled}]"})
+        room = (budget or self.budget) - sum(estimate_tokens(m) for m in head + recall)
+        tail = self._tail(history[1:], room)
+        return head + tail[:-1] + recall + tail[-1:]
+
+    def trim(self, history, fold=True):
+        """
+        Drops the oldest turns that no longer fit and queues them for summarizing.
+        Once over budget it trims down to LOW_WATER, so the kept prefix then stays
+        identical (and cacheable by the model server) for the next several turns.
+        """
+        summary_cost = estimate_tokens({'content': self.summary}) if self.summary else 0
+        room = self.budget - estimate_tokens(history[0]) - summary_cost
+        if sum(estimate_tokens(m) for m in history[1:]) > room: room = int(room * LOW_WATER)
+        tail = self._tail(history[1:], room)
+        dropped = history[1:len(history) - len(tail)]
+        if dropped and fold and self.summarize: self._folds.put(dropped)
+        return [history[0]] + tail
+
+    def _tail(self, messages, room):
+        kept = []
+        for message in reversed(messages):
+            cost = estimate_tokens(message)
+            # Always keep the newest message, even if it alone is over budget
+            if kept and cost > room: break
+            kept.append(message)
+            room -= cost
+        kept.reverse()
+        return kept
+
+    # --- OBSERVABILITY ---
+    def record_turn(self, messages, prompt_eval_count=None, prefill_seconds=None):
+        estimate = sum(estimate_tokens(m) for m in messages)
+        self.turns.append((estimate, prompt_eval_count, prefill_seconds))
+        if len(self.turns) > 100: del self.turns[0]
+        prefill = f"{prefill_seconds * 1000:.0f} ms" if prefill_seconds is not None else "n/a"
+        print(f"[Context] prompt ~{estimate} tokens (model: {prompt_eval_count}), prefill {prefill}")
+
+    def stats(self):
+        measured = [t for t in self.turns if t[2] is not None]
+        return {
+            "budget": self.budget,
+            "summary_tokens": estimate_tokens({'content': self.summary}) if self.summary else 0,
+            "last_prompt_tokens": self.turns[-1][0] if self.turns else None,
+            "avg_prompt_tokens": sum(t[0] for t in self.turns) / len(self.turns) if self.turns else None,
+            "avg_prefill_ms": sum(t[2] for t in measured) * 1000 / len(measured) if measured else None,
+            "pending_folds": self._folds.qsize()
+        }
+
+    # --- BACKGROUND SUMMARY ---
+    def close(self):
+        """Ends the summary thread; folds still queued are dropped."""
+        self._folds.put(None)
+
+    def _fold_loop(self):
+        while True:
+            dropped = self._folds.get()
+            if dropped is None: return
+            # Merge whatever else piled up so the model is called once
+            while not self._folds.empty():
+                more = self._folds.get()
+                if more is None: return  # closed: a session going away needs no summary
+                dropped += more
+            try:
+                self.summary = self.summarize(self.summary, dropped).strip()
+                self._save()
+            except Exception as e:
+                print(f"[Context] Summary failed: {e}")
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path): return ""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: return json.load(f).get('summary', "")
+        except (OSError, ValueError) as e:
+            print(f"[Context] Ignoring unreadable summary: {e}")
+            return ""
+
+    def _save(self):
+        if not self.path: return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f: json.dump({'summary': self.summary}, f)
+            os.replace(tmp, self.path)
+        except OSError as e: print(f"[Context] Save failed: {e}")
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_FILE = "core/intent_cache.json"
+CACHE_TTL = 7 * 24 * 3600  # a week; app names and phrasing rarely change faster
+CACHE_SIZE = 500
+SAVE_DELAY = 5  # seconds to batch writes before touching the disk
+
+class IntentCache:
+    """
+    Persistent LRU of parsed router intents keyed on normalized request text.
+    Entries expire after `ttl` seconds; the file is rewritten atomically in the background.
+    """
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_entries=CACHE_SIZE, schema=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.schema = schema or {}
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._miss_latency = 0.0  # running average of what a miss costs
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._load()
+
+    def is_cacheable(self, intent):
+        spec = self.schema.get(intent.get('action'), {})
+        if not spec.get('cacheable', True): return False
+        return intent.get('target') not in spec.get('volatile_targets', ())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or time.time() - entry['t'] > self.ttl:
+                if entry is not None: del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += self._miss_latency
+            return dict(entry['intent'])
+
+    def put(self, key, intent, latency=None):
+        if latency is not None:
+            # Exponential average keeps "latency saved" honest as the network changes
+            self._miss_latency = latency if not self._miss_latency else 0.8 * self._miss_latency + 0.2 * latency
+        if not self.is_cacheable(intent): return
+        with self._lock:
+            self._items[key] = {'intent': intent, 't': time.time()}
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries: self._items.popitem(last=False)
+        self._schedule_save()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._items), "latency_saved_s": round(self.saved_seconds, 3)
+        }
+
+    # --- PERSISTENCE ---
+    def _load(self):
+        if not self.path or not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+            now = time.time()
+            for key, entry in data.get('entries', []):
+                # Skip entries a newer schema no longer allows (e.g. jobs cached before ids went volatile)
+                if now - entry['t'] <= self.ttl and self.is_cacheable(entry['intent']): self._items[key] = entry
+            self._miss_latency = data.get('miss_latency', 0.0)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[Cache] Ignoring unreadable intent cache: {e}")
+
+    def _schedule_save(self):
+        if not self.path: return
+        with self._lock:
+            if self._save_timer is not None: return
+            self._save_timer = threading.Timer(SAVE_DELAY, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def save(self):
+        with self._lock:
+            self._save_timer = None
+            data = {'entries': list(self._items.items()), 'miss_latency': self._miss_latency}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e: print(f"[Cache] Save failed: {e}")
@@ -0,0 +1,125 @@
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.scheduler import CancelToken
+from core.tracing import TRACER
+
+JOBS_FILE = "core/jobs.json"
+MAX_RUNNING = 2     # jobs doing work at the same time; the rest wait as "queued"
+MAX_QUEUED = 10     # beyond this, new jobs are refused
+KEEP_FINISHED = 50  # finished jobs kept in the list (newest)
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+# Session that started the job (None = the desktop session); set by Brain for its turns
+JOB_OWNER = contextvars.ContextVar("job_owner", default=None)
+
+class JobManager:
+    """
+    Long skills (reports, web searches) run here instead of inside the turn.
+    submit() returns a job id at once; the work runs on a small pool and
+    on_done(job) is called when it ends. The job list is saved to disk, so
+    finished results survive a restart (unfinished ones come back "interrupted").
+    """
+    def __init__(self, path=JOBS_FILE, workers=MAX_RUNNING, max_queued=MAX_QUEUED, on_done=None):
+        self.path = path
+        self.max_queued = max_queued
+        self.on_done = on_done
+        self.jobs = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._load()
+        self._ids = itertools.count(max((int(i) for i in self.jobs), default=0) + 1)
+
+    # --- API ---
+    def submit(self, kind, target, fn):
+        """
+        Queues fn(job, cancel) and returns the job (a dict), or None if too much is queued.
+        fn returns the result text; it may update job['progress'] and job['path'] as it goes.
+        """
+        with self._lock:
+            active = sum(1 for j in self.jobs.values() if j['state'] not in FINISHED)
+            if active >= self.max_queued: return None
+            job = {"id": str(next(self._ids)), "kind": kind, "target": target, "state": "queued",
+                   "created": time.time(), "finished": None, "progress": 0, "path": None, "result": None,
+                   "owner": JOB_OWNER.get()}
+            self.jobs[job['id']] = job
+            self._tokens[job['id']] = CancelToken()
+        self.save()
+        self._executor.submit(self._run, job, fn, TRACER.turn)
+        print(f"[Jobs] #{job['id']} {kind} queued: {target}")
+        return job
+
+    def cancel(self, job_id):
+        with self._lock:
+            job, token = self.jobs.get(str(job_id)), self._tokens.get(str(job_id))
+            if job is None or job['state'] in FINISHED: return False
+            if job['state'] == "queued": self._finish(job, "cancelled", "Cancelled before it started.")
+        if token: token.cancel()
+        self.save()
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(str(job_id))
+            return dict(job) if job else None
+
+    def list(self, active_only=False):
+        with self._lock:
+            jobs = [dict(j) for j in self.jobs.values() if not active_only or j['state'] not in FINISHED]
+        return sorted(jobs, key=lambda j: j['created'])
+
+    def latest_active(self):
+        jobs = self.list(active_only=True)
+        return jobs[-1] if jobs else None
+
+    # --- EXECUTION ---
+    def _run(self, job, fn, turn):
+        with self._lock:
+            if job['state'] != "queued": return  # cancelled while waiting
+            job['state'] = "running"
+            token = self._tokens[job['id']]
+        self.save()
+        try:
+            with TRACER.span("job", turn, kind=job['kind']): result = fn(job, token)
+            state = "cancelled" if token.cancelled else "done"
+        except Exception as e:
+            result, state = f"{job['kind']} failed: {e}", "failed"
+        with self._lock: self._finish(job, state, result)
+        self.save()
+        print(f"[Jobs] #{job['id']} {state}")
+        if self.on_done:
+            try: self.on_done(dict(job))
+            except Exception as e: print(f"[Jobs] on_done error: {e}")
+
+    def _finish(self, job, state, result):
+        job['state'], job['result'], job['finished'] = state, result, time.time()
+        self._tokens.pop(job['id'], None)
+        done = sorted((j for j in self.jobs.values() if j['state'] in FINISHED), key=lambda j: j['created'])
+        for old in done[:-KEEP_FINISHED]: del self.jobs[old['id']]
+
+    # --- PERSISTENCE ---
+    def _load(self):
+        if not self.path or not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: jobs = json.load(f)
+            for job in jobs:
+                # The process that ran it is gone; a partial report may still be on disk
+                if job['state'] not in FINISHED:
+                    job['state'], job['result'] = "interrupted", "Stopped by a restart."
+                self.jobs[job['id']] = job
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[Jobs] Ignoring unreadable job list: {e}")
+
+    def save(self):
+        if not self.path: return
+        tmp = self.path + ".tmp"
+        try:
+            with self._lock:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(sorted(self.jobs.values(), key=lambda j: j['created']), f)
+                os.replace(tmp, self.path)
+        except OSError as e: print(f"[Jobs] Save failed: {e}")
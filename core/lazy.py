@@ -0,0 +1,33 @@
+import importlib
+import threading
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access.
+    Optional modules that fail to import are falsy, like the old `x = None` fallbacks.
+    """
+    def __init__(self, name, optional=False):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_optional", optional)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_missing", False)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        if self._module is None and not self._missing:
+            with self._lock:
+                if self._module is None and not self._missing:
+                    try: object.__setattr__(self, "_module", importlib.import_module(self._name))
+                    except ImportError:
+                        if not self._optional: raise
+                        object.__setattr__(self, "_missing", True)
+        return self._module
+
+    def __bool__(self): return self._load() is not None
+
+    def __getattr__(self, attr):
+        module = self._load()
+        if module is None: raise AttributeError(f"{self._name} is not installed")
+        return getattr(module, attr)
+
+    def __setattr__(self, attr, value): setattr(self._load(), attr, value)
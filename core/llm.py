@@ -0,0 +1,200 @@
+import statistics
+import threading
+import time
+from collections import deque
+import ollama
+
+KEEP_ALIVE = "30m"  # keep the model resident between turns (Ollama's default is 5m)
+OLLAMA_HOST = None  # None = OLLAMA_HOST env var or http://localhost:11434
+# Changing options between calls makes Ollama reload the model, so every call shares these
+MODEL_OPTIONS = {"num_ctx": 4096}
+MAX_GENERATIONS = 2     # generations in flight across all models and sessions
+INTERACTIVE_KINDS = ("chat", "recall")  # user turns (and their memory lookup): never wait behind background work
+DROPPABLE_KINDS = ("autonomy",)  # unprompted quips: dropped when a user turn arrives
+
+class Preempted(Exception):
+    """A background generation gave way to a user turn."""
+
+class _Grant:
+    __slots__ = ("interactive", "droppable", "preempted")
+    def __init__(self, interactive, droppable):
+        self.interactive, self.droppable = interactive, droppable
+        self.preempted = threading.Event()
+
+class ModelLimiter:
+    """
+    One gate in front of the model server, shared by every model and session.
+    Interactive calls always get in: arriving, they stop droppable background
+    generations (which notice at their next token) and then wait only for a
+    free slot. Background calls start only while no interactive call is running
+    or waiting; droppable ones are refused instead of waiting.
+    """
+    def __init__(self, slots=MAX_GENERATIONS):
+        self.slots = slots
+        self._cond = threading.Condition()
+        self._running = set()
+        self._interactive = 0  # interactive calls running or waiting
+
+    def acquire(self, interactive, droppable=False):
+        grant = _Grant(interactive, droppable)
+        with self._cond:
+            if interactive:
+                self._interactive += 1
+                for g in self._running:
+                    if g.droppable: g.preempted.set()
+                while len(self._running) >= self.slots: self._cond.wait()
+            else:
+                while self._interactive or len(self._running) >= self.slots:
+                    if droppable: raise Preempted("a user turn is in progress")
+                    self._cond.wait()
+            self._running.add(grant)
+        return grant
+
+    def release(self, grant):
+        with self._cond:
+            self._running.discard(grant)
+            if grant.interactive: self._interactive -= 1
+            self._cond.notify_all()
+
+LIMITER = ModelLimiter()
+
+class LLMSession:
+    """
+    One pooled Ollama client per model tier ("primary", "small"). Warms and pins
+    the model with an explicit keep-alive, passes every call through the shared
+    limiter, and records queueing / load / prefill / first-token timings per call.
+    """
+    def __init__(self, model, host=OLLAMA_HOST, keep_alive=KEEP_ALIVE, options=None, tier="primary",
+                 limiter=LIMITER, timeout=None):
+        self.model = model
+        self.tier = tier
+        self.keep_alive = keep_alive
+        self.options = options if options is not None else MODEL_OPTIONS
+        self.limiter = limiter
+        self.client = ollama.Client(host=host, timeout=timeout)  # httpx client underneath: connections are reused
+        self.ready = threading.Event()
+        self.warm_error = None
+        self._warming = False
+        self.calls = []
+        self.waits = deque(maxlen=200)  # seconds each call queued at the limiter
+        self.dropped = 0    # refused or stopped for a user turn
+        self._lock = threading.Lock()
+
+    @property
+    def usable(self):
+        """Loaded (or still loading) without error."""
+        return self.warm_error is None
+
+    # --- WARM-UP ---
+    def warm(self):
+        """Loads the model into memory before the first user turn (an empty prompt only loads)."""
+        start = time.perf_counter()
+        try:
+            response = self.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive,
+                                            options=self.options)
+            self._record("warmup", start, None, response)
+            print(f"[LLM] {self.model} warm in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self.warm_error = e
+            print(f"[LLM] Warm-up failed: {e}")
+        finally:
+            self.ready.set()
+
+    def warm_async(self):
+        """Starts warming once; later calls are no-ops."""
+        with self._lock:
+            if self._warming: return
+            self._warming = True
+        threading.Thread(target=self.warm, daemon=True).start()
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the model answered the warm-up (raises if it could not be reached)."""
+        self.warm_async()
+        if not self.ready.wait(timeout): raise TimeoutError(f"{self.model} did not load in {timeout}s")
+        if self.warm_error: raise self.warm_error
+        return self
+
+    # --- CALLS ---
+    def chat(self, messages, kind="chat", cancel=None):
+        """Whole reply at once. Streams underneath, so a preempted call stops at the next token."""
+        parts, final = [], None
+        for chunk in self.stream(messages, kind, cancel):
+            parts.append(chunk['message']['content'])
+            if chunk.get('done'): final = chunk
+        if final is None: return {'message': {'role': 'assistant', 'content': "".join(parts)}}
+        final['message']['content'] = "".join(parts)  # the last chunk carries the stats; give it the whole text
+        return final
+
+    def stream(self, messages, kind="chat", cancel=None):
+        """
+        Streaming chat; yields Ollama chunks and records timings when the last one
+        arrives. Background kinds raise Preempted if a user turn takes their place,
+        and any call does once its CancelToken is cancelled.
+        """
+        queued = time.perf_counter()
+        try: grant = self.limiter.acquire(kind in INTERACTIVE_KINDS, kind in DROPPABLE_KINDS)
+        except Preempted:
+            with self._lock: self.dropped += 1
+            raise
+        start = time.perf_counter()
+        with self._lock: self.waits.append(start - queued)
+        if cancel is not None: cancel.on_cancel(grant.preempted.set)
+        first, stream = None, None
+        try:
+            stream = self.client.chat(model=self.model, messages=messages, stream=True,
+                                      keep_alive=self.keep_alive, options=self.options)
+            for chunk in stream:
+                if grant.preempted.is_set():
+                    with self._lock: self.dropped += 1
+                    raise Preempted(f"{kind} stopped for a user turn")
+                if first is None and chunk['message']['content']: first = time.perf_counter()
+                if chunk.get('done'): self._record(kind, start, first, chunk, queued)
+                yield chunk
+        finally:
+            # Also runs on cancel: dropping the response makes Ollama stop generating
+            if hasattr(stream, 'close'): stream.close()
+            self.limiter.release(grant)
+
+    def embed(self, text, kind="embed"):
+        """Embedding vector for text, with the same keep-alive and through the same limiter as generations."""
+        queued = time.perf_counter()
+        grant = self.limiter.acquire(kind in INTERACTIVE_KINDS, kind in DROPPABLE_KINDS)
+        with self._lock: self.waits.append(time.perf_counter() - queued)
+        try:
+            return self.client.embeddings(model=self.model, prompt=text, keep_alive=self.keep_alive,
+                                          options=self.options)['embedding']
+        finally:
+            self.limiter.release(grant)
+
+    # --- METRICS ---
+    def _record(self, kind, start, first, final, queued=None):
+        def ms(key):
+            ns = final.get(key)
+            return round(ns / 1e6, 1) if ns else None
+        eval_count, eval_ns = final.get('eval_count'), final.get('eval_duration')
+        call = {
+            "kind": kind,
+            "queue_ms": round((start - queued) * 1000, 1) if queued else None,
+            "load_ms": ms('load_duration'),
+            "prefill_ms": ms('prompt_eval_duration'),
+            "prompt_tokens": final.get('prompt_eval_count'),
+            "ttft_ms": round((first - start) * 1000, 1) if first else None,
+            "tokens": eval_count,
+            "tok_per_s": round(eval_count / (eval_ns / 1e9), 1) if eval_count and eval_ns else None,
+        }
+        with self._lock:
+            self.calls.append(call)
+            if len(self.calls) > 200: del self.calls[0]
+        print(f"[LLM] {self.tier} {kind}: load {call['load_ms']} ms, prefill {call['prefill_ms']} ms "
+              f"({call['prompt_tokens']} tok), first token {call['ttft_ms']} ms")
+
+    def report(self):
+        with self._lock: calls, waits, dropped = list(self.calls), sorted(self.waits), self.dropped
+        def median(key):
+            xs = [c[key] for c in calls if c[key] is not None]
+            return statistics.median(xs) if xs else None
+        def wait(q): return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else None
+        return {"tier": self.tier, "model": self.model, "calls": len(calls), "dropped": dropped,
+                "queue_p50_ms": wait(0.5), "queue_p95_ms": wait(0.95), "median_load_ms": median("load_ms"),
+                "median_prefill_ms": median("prefill_ms"), "median_ttft_ms": median("ttft_ms"),
+                "median_tok_per_s": median("tok_per_s"), "last": calls[-1] if calls else None}
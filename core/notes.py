@@ -0,0 +1,291 @@
+import datetime
+import glob
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+NOTES_FILE = "core/notes.db"
+FLUSH_INTERVAL = 0.2   # seconds of write-behind batching
+FLUSH_BATCH = 256      # ...or this many queued notes, whichever comes first
+SEARCH_LIMIT = 5       # notes returned per search
+RANK_WINDOW = 500      # newest matches that get BM25-ranked; older matches of a common word are never ranked
+DAILY_FILE = re.compile(r"Notes_(\d{4}-\d{2}-\d{2})\.txt$")
+DAILY_LINE = re.compile(r"^\[(\d{1,2}):(\d{2})\] ?(.*)$")
+TAG = re.compile(r"#([\w-]+)")
+WORD = re.compile(r"\w+")
+# Words of the request itself ("what did I note about...") that never help the match
+STOP_WORDS = frozenset("""
+a an the and or of to in on at for about with from my me i did do does what which when where
+note notes noted say said write wrote written find search show tell any anything something
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    text TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_notes_ts ON notes(ts);
+CREATE TABLE IF NOT EXISTS note_tags (
+    tag TEXT NOT NULL,
+    ts REAL NOT NULL,
+    note_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, ts, note_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imports (
+    file TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+# External-content index: the text lives once, in `notes`
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    text, tags, content='notes', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+def tags_of(text):
+    return sorted({t.lower() for t in TAG.findall(text)})
+
+# --- DATES ---
+def _day(d): return datetime.datetime.combine(d, datetime.time()).timestamp()
+
+def parse_when(phrase, today=None):
+    """
+    (since, until) timestamps for phrases like "today", "last week",
+    "last 3 days", "this month" or "2024-05-01"; (None, None) if no date.
+    """
+    if not phrase: return None, None
+    p = " ".join(str(phrase).lower().split())
+    today = today or datetime.date.today()
+    end = _day(today + datetime.timedelta(days=1))
+    monday = today - datetime.timedelta(days=today.weekday())
+    first = today.replace(day=1)
+    if "yesterday" in p: return _day(today - datetime.timedelta(days=1)), _day(today)
+    if "today" in p: return _day(today), end
+    m = re.search(r"(?:last|past) (\d+) (day|week|month)s?", p)
+    if m:
+        days = int(m.group(1)) * {"day": 1, "week": 7, "month": 30}[m.group(2)]
+        return _day(today - datetime.timedelta(days=days - 1)), end
+    if "last week" in p: return _day(monday - datetime.timedelta(days=7)), _day(monday)
+    if "this week" in p: return _day(monday), end
+    if "last month" in p: return _day((first - datetime.timedelta(days=1)).replace(day=1)), _day(first)
+    if "this month" in p: return _day(first), end
+    m = re.search(r"(\d{4})-(\d{2})-(\d{2})", p)
+    if m:
+        try: d = datetime.date(*map(int, m.groups()))
+        except ValueError: return None, None
+        if "since" in p or "after" in p: return _day(d), end
+        return _day(d), _day(d + datetime.timedelta(days=1))
+    return None, None
+
+WHEN = re.compile(r"\b(?:(?:from |in )?(?:the )?(?:(?:last|past) \d+ (?:day|week|month)s?|(?:last|this) (?:week|month)"
+                  r"|today|yesterday)|(?:on |since |after )?\d{4}-\d{2}-\d{2})\b")
+
+def split_when(text):
+    """Splits a date phrase off a request: "milk last week" -> ("milk", since, until)."""
+    m = WHEN.search(text.lower())
+    if not m: return text, None, None
+    since, until = parse_when(m.group(0))
+    return (text[:m.start()] + text[m.end():]).strip(), since, until
+
+def match_query(text):
+    """FTS5 query for free text: every meaningful word must appear (quoted, so input can't inject syntax)."""
+    words = [w for w in WORD.findall(TAG.sub(" ", text.lower())) if w not in STOP_WORDS]
+    return " ".join(f'"{w}"' for w in words)
+
+class NoteStore:
+    """
+    Notes in SQLite with an FTS5 index (BM25-ranked search), a timestamp
+    index for date ranges and a tag table for #tags. Like ConversationStore,
+    add() only queues; a background thread commits in batches. Searches
+    wait for queued notes first, so a note is findable as soon as it is added.
+    Without FTS5 in the sqlite build, text search falls back to LIKE.
+    """
+    def __init__(self, path=NOTES_FILE):
+        self.path = path
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        try:
+            self._reader.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            print("[Notes] FTS5 not available, text search will be slow")
+            self.fts = False
+        threading.Thread(target=self._write_loop, name="notes", daemon=True).start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- WRITES ---
+    def add(self, text, ts=None):
+        self._queue.put((time.time() if ts is None else ts, text.strip()))
+
+    def flush(self):
+        """Blocks until every queued note is committed."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self.flush()
+
+    def _insert(self, conn, rows):
+        """rows: (ts, text). Runs inside the caller's transaction."""
+        for ts, text in rows:
+            tags = tags_of(text)
+            note_id = conn.execute("INSERT INTO notes(ts, text, tags) VALUES (?, ?, ?)",
+                                   (ts, text, " ".join(tags))).lastrowid
+            if self.fts:
+                conn.execute("INSERT INTO notes_fts(rowid, text, tags) VALUES (?, ?, ?)",
+                             (note_id, text, " ".join(tags)))
+            conn.executemany("INSERT OR IGNORE INTO note_tags(tag, ts, note_id) VALUES (?, ?, ?)",
+                             [(tag, ts, note_id) for tag in tags])
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH and batch[-1] is not None:
+                try: batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty: break
+            rows = [row for row in batch if row is not None and row[1]]
+            try:
+                with conn: self._insert(conn, rows)
+            except sqlite3.Error as e: print(f"[Notes] Write failed, {len(rows)} notes lost: {e}")
+            for _ in batch: self._queue.task_done()
+            if batch[-1] is None:
+                conn.close()
+                return
+
+    # --- IMPORT ---
+    def import_daily_files(self, directory):
+        """
+        Imports Notes_<date>.txt files ("[HH:MM] text" per line). Remembers how
+        far each file was read, so lines appended later are picked up next time.
+        """
+        conn = self._connect()
+        conn.isolation_level = None  # transactions are explicit below
+        total = 0
+        try:
+            # Offsets only grow, so this snapshot can only skip files that really are done
+            done = dict(conn.execute("SELECT file, offset FROM imports"))
+            for path in sorted(glob.glob(os.path.join(directory, "Notes_*.txt"))):
+                name = os.path.basename(path)
+                m = DAILY_FILE.search(name)
+                if not m or os.path.getsize(path) <= done.get(name, 0): continue
+                total += self._import_file(conn, path, name, datetime.date.fromisoformat(m.group(1)))
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"[Notes] Import stopped: {e}")
+        finally:
+            conn.close()
+        if total: print(f"[Notes] Imported {total} notes from {directory}")
+        return total
+
+    def _import_file(self, conn, path, name, day):
+        """
+        Reads the file from its stored offset, under the write lock: the notes and the new
+        offset commit together, so neither a crash nor a concurrent import adds them twice.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT offset FROM imports WHERE file = ?", (name,)).fetchone()
+            offset = row[0] if row else 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            data = data[:data.rfind(b"\n") + 1]  # a half-written last line waits for next time
+            rows = []
+            for line in data.decode("utf-8", errors="replace").splitlines():
+                lm = DAILY_LINE.match(line)
+                hour, minute, text = (int(lm.group(1)), int(lm.group(2)), lm.group(3)) if lm else (0, 0, line)
+                if text.strip(): rows.append((_day(day) + hour * 3600 + minute * 60, text.strip()))
+            if data:
+                self._insert(conn, rows)
+                conn.execute("INSERT OR REPLACE INTO imports(file, offset) VALUES (?, ?)", (name, offset + len(data)))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    # --- READS ---
+    def _query(self, sql, args=()):
+        with self._read_lock:
+            return self._reader.execute(sql, args).fetchall()
+
+    def search(self, text="", since=None, until=None, tags=(), limit=SEARCH_LIMIT):
+        """
+        Best matches for text, newest first when there is no text. #tags in
+        text are filters too. Returns [{'id', 'ts', 'text', 'tags'}].
+        """
+        if self._queue.unfinished_tasks: self.flush()
+        tags = [t.lower().lstrip("#") for t in tags] + tags_of(text or "")
+        query = match_query(text or "")
+        if query and self.fts:
+            rows = self._ranked(query, since, until, tags, limit)
+            if not rows and " " in query:  # nothing has every word: settle for any of them
+                rows = self._ranked(query.replace(" ", " OR "), since, until, tags, limit)
+        elif tags and not query:
+            # Driven by the (tag, ts) key: an index range scan, newest first
+            sql = "SELECT n.id, n.ts, n.text, n.tags FROM note_tags t JOIN notes n ON n.id = t.note_id WHERE t.tag = ?"
+            where, args = self._filters(since, until, tags[1:], "t.ts")
+            rows = self._query(" AND ".join([sql] + where) + " ORDER BY t.ts DESC LIMIT ?", [tags[0]] + args + [limit])
+        else:
+            where, args = self._filters(since, until, tags)
+            for word in query.replace('"', "").split():
+                where.append("n.text LIKE ?")
+                args.append(f"%{word}%")
+            sql = "SELECT n.id, n.ts, n.text, n.tags FROM notes n"
+            if where: sql += " WHERE " + " AND ".join(where)
+            rows = self._query(sql + " ORDER BY n.ts DESC LIMIT ?", args + [limit])
+        return [{'id': i, 'ts': ts, 'text': t, 'tags': g.split()} for i, ts, t, g in rows]
+
+    def _filters(self, since, until, tags, ts="n.ts"):
+        where, args = [], []
+        if since is not None:
+            where.append(f"{ts} >= ?")
+            args.append(since)
+        if until is not None:
+            where.append(f"{ts} < ?")
+            args.append(until)
+        for tag in tags:
+            where.append("EXISTS (SELECT 1 FROM note_tags WHERE tag = ? AND ts = n.ts AND note_id = n.id)")
+            args.append(tag)
+        return where, args
+
+    def _ranked(self, query, since, until, tags, limit):
+        """
+        BM25 over the newest RANK_WINDOW matches. A word in fewer notes than
+        that is ranked exactly. For a common word, this returns the best of
+        its most recent matches, not the best overall: a better but older
+        note is never ranked.
+
+        Not sub-millisecond for common words. FTS5's bm25() counts every note
+        that contains each query term, once per query, and each windowed row
+        costs about 1 us to score. At 300k notes (benchmarks/notes_bench.py)
+        the p50/p95 times are:
+          - rare word: 0.4 / 0.9 ms
+          - common word: 1.3 / 2.7-4.8 ms
+          - word + #tag: 3.1 / 4-6 ms
+          - #tag or date range alone: 0.015 ms
+        """
+        # Tags are matched inside the index too (the `tags` column), so FTS5 intersects the lists
+        match = f"({query})" + "".join(f' AND tags : "{tag}"' for tag in tags)
+        where, args = self._filters(since, until, ())
+        sql = ("SELECT n.id, n.ts, n.text, n.tags, rank AS score FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+               "WHERE " + " AND ".join(["notes_fts MATCH ?"] + where) + " ORDER BY notes_fts.rowid DESC LIMIT ?")
+        return self._query(f"SELECT id, ts, text, tags FROM ({sql}) ORDER BY score LIMIT ?",
+                           [match] + args + [RANK_WINDOW, limit])
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM notes")[0][0]
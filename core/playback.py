@@ -0,0 +1,154 @@
+import collections
+import io
+import threading
+import time
+from core.lazy import LazyModule
+
+pygame = LazyModule("pygame")
+
+TICK = 0.02  # how often the engine checks for finished segments (seconds)
+DUMMY_BYTES_PER_SECOND = 6000  # edge-tts mp3 is ~48 kbit/s
+
+# --- DRIVERS ---
+# A driver plays decoded segments on one channel: play() starts one now,
+# queue() lines one up to start the moment the current one ends (gapless),
+# current() is what is audible right now, stop() silences and clears both.
+class PygameDriver:
+    def __init__(self):
+        if not pygame.mixer.get_init(): pygame.mixer.init()
+        self.channel = pygame.mixer.Channel(0)
+
+    def load(self, audio):
+        return pygame.mixer.Sound(file=io.BytesIO(audio))
+
+    def play(self, sound): self.channel.play(sound)
+    def queue(self, sound): self.channel.queue(sound)
+    def current(self): return self.channel.get_sound() if self.channel.get_busy() else None
+    def stop(self): self.channel.stop()
+
+class DummyDriver:
+    """
+    Silent driver on a simulated timeline, for tests and benchmarks.
+    A segment "plays" for len(audio) / bytes_per_second seconds; `played`
+    records (audio, start, end) so gaps and cut-offs can be checked.
+    """
+    def __init__(self, bytes_per_second=DUMMY_BYTES_PER_SECOND, clock=time.perf_counter):
+        self.bytes_per_second = bytes_per_second
+        self.clock = clock
+        self.played = []
+        self._now = None    # [segment, start, end]
+        self._next = None
+
+    def load(self, audio): return memoryview(audio)  # a new object per segment, even for cached audio
+
+    def _length(self, audio): return len(audio) / self.bytes_per_second
+
+    def play(self, audio):
+        start = self.clock()
+        self._now, self._next = [audio, start, start + self._length(audio)], None
+        self.played.append(self._now)
+
+    def queue(self, audio): self._next = audio
+
+    def current(self):
+        now = self.clock()
+        while self._now and now >= self._now[2]:
+            if self._next is None:
+                self._now = None
+                break
+            # Gapless: the queued segment starts exactly when the last one ended
+            start = self._now[2]
+            self._now, self._next = [self._next, start, start + self._length(self._next)], None
+            self.played.append(self._now)
+        return self._now[0] if self._now else None
+
+    def stop(self):
+        if self._now: self._now[2] = self.clock()  # cut short
+        self._now = self._next = None
+
+# --- ENGINE ---
+class _Utterance:
+    __slots__ = ("handle", "on_done")
+    def __init__(self, handle, on_done): self.handle, self.on_done = handle, on_done
+
+class PlaybackEngine:
+    """
+    Plays queued utterances on its own thread. enqueue() returns at once;
+    each utterance's on_done(finished) runs when it ends (False if stopped).
+    The next utterance is always handed to the driver ahead of time, so
+    consecutive sentences play back to back. stop() silences and flushes
+    everything immediately. on_start / on_idle fire when audio begins and
+    when the queue runs dry.
+    """
+    def __init__(self, driver, on_start=None, on_idle=None, tick=TICK):
+        self.driver = driver
+        self.on_start = on_start
+        self.on_idle = on_idle
+        self.tick = tick
+        self._queue = collections.deque()
+        self._playing = None  # audible now
+        self._next = None     # already queued in the driver
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._loop, name="playback", daemon=True).start()
+
+    def enqueue(self, audio, on_done=None):
+        """Decodes on the caller's thread, so the playback thread never waits on it."""
+        handle = self.driver.load(audio)
+        with self._cond:
+            self._queue.append(_Utterance(handle, on_done))
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            dropped = [u for u in (self._playing, self._next) if u] + list(self._queue)
+            self._queue.clear()
+            self._playing = self._next = None
+            self.driver.stop()
+        for u in dropped: self._finish(u, False)
+        if dropped and self.on_idle: self.on_idle()
+
+    def close(self):
+        """Stops playback and ends the playback thread."""
+        self.stop()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    @property
+    def busy(self):
+        with self._cond: return self._playing is not None or bool(self._queue)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                # Sleep until there is work; while playing, wake every tick to notice endings
+                if self._playing is None and not self._queue: self._cond.wait()
+                else: self._cond.wait(self.tick)
+                if self._closed: return
+                was_playing = self._playing is not None
+                finished = self._advance()
+                started = not was_playing and self._playing is not None
+                idle = was_playing and self._playing is None
+            if started and self.on_start: self.on_start()
+            for u in finished: self._finish(u, True)
+            if idle and self.on_idle: self.on_idle()
+
+    def _advance(self):
+        finished = []
+        now = self.driver.current()
+        while self._playing and now is not self._playing.handle:
+            finished.append(self._playing)
+            self._playing, self._next = self._next, None
+        if self._playing is None and self._queue:
+            self._playing = self._queue.popleft()
+            self.driver.play(self._playing.handle)
+        if self._playing and self._next is None and self._queue:
+            self._next = self._queue.popleft()
+            self.driver.queue(self._next.handle)
+        return finished
+
+    def _finish(self, utterance, completed):
+        if utterance.on_done:
+            try: utterance.on_done(completed)
+            except Exception as e: print(f"[Playback] Callback error: {e}")
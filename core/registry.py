@@ -0,0 +1,106 @@
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+SKILL_WORKERS = 2     # long-running skills that may run at the same time
+MAX_PENDING = 8       # beyond this, new background skills are refused
+
+class Skill:
+    """One router action: what it is called, which intent fields it takes and how it runs."""
+    def __init__(self, name, fn, args=None, label=None, blocking=False, timeout=10,
+                 cacheable=True, commands=None, volatile=()):
+        self.name = name
+        self.fn = fn
+        self.args = args or {}          # intent field -> placeholder shown to the router
+        self.label = label or name.upper()
+        self.blocking = blocking        # True: always runs in the background, reply doesn't wait
+        self.timeout = timeout          # seconds the reply waits before moving on without the result
+        self.cacheable = cacheable      # may the router cache this intent?
+        self.commands = commands or ()  # allowed `target` values, listed in the router prompt
+        self.volatile = tuple(volatile) # targets whose intent must never be cached
+
+    def call(self, intent):
+        return self.fn(*[intent.get(field) for field in self.args])
+
+def skill(name, **spec):
+    """Marks a SkillSet method as a router action; collected by SkillRegistry.collect()."""
+    def mark(fn):
+        fn._skill_spec = (name, spec)
+        return fn
+    return mark
+
+class SkillRegistry:
+    """
+    Table of skills. Dispatch is a dict lookup, the router prompt and the intent
+    cache schema are generated from it, and skills run on a bounded executor.
+    """
+    def __init__(self, workers=SKILL_WORKERS, max_pending=MAX_PENDING):
+        self.skills = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="skill")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def register(self, name, fn, **spec):
+        self.skills[name] = Skill(name, fn, **spec)
+
+    def collect(self, obj):
+        """Registers every @skill-decorated method of obj, in definition order."""
+        for attr in type(obj).__dict__.values():
+            spec = getattr(attr, '_skill_spec', None)
+            if spec: self.register(spec[0], attr.__get__(obj), **spec[1])
+        return self
+
+    def get(self, name):
+        return self.skills.get(name)
+
+    # --- SCHEMAS ---
+    def router_schema(self):
+        """The numbered action list for the router prompt."""
+        lines = []
+        for i, s in enumerate(self.skills.values(), 1):
+            fields = {"action": s.name, **s.args}
+            # Placeholders like number_or_null are written bare, as the router expects
+            body = ", ".join(f'"{k}": ' + (json.dumps(v) if k == "action" or not v.endswith("_or_null") else v)
+                             for k, v in fields.items())
+            lines.append(f"{i}. {s.label}: {{{body}}}")
+            if s.commands: lines.append(f"   (commands: {', '.join(s.commands)})")
+        return "\n".join(lines)
+
+    def cache_schema(self):
+        return {s.name: {"cacheable": s.cacheable, "volatile_targets": s.volatile} for s in self.skills.values()}
+
+    # --- EXECUTION ---
+    def dispatch(self, intent, on_done=None):
+        """
+        Runs the skill for intent. Returns its result if it finishes within the
+        skill's timeout; otherwise returns a "working on it" note and hands the
+        real result to on_done(intent, result) when it arrives.
+        """
+        s = self.skills.get(intent.get('action'))
+        if s is None or s.fn is None: return None
+        if not self._slots.acquire(blocking=False):
+            return f"Too many tasks running, {s.name} was skipped."
+
+        lock = threading.Lock()
+        state = {"late": s.blocking, "finished": False, "result": None}
+        def run():
+            try: result = s.call(intent)
+            except Exception as e: result = f"{s.name} failed: {e}"
+            finally: self._slots.release()
+            with lock:
+                state["finished"], state["result"] = True, result
+                late = state["late"]
+            if late and on_done: on_done(intent, result)
+
+        # Carry the caller's context (e.g. which session owns jobs) into the worker
+        future = self._executor.submit(contextvars.copy_context().run, run)
+        if s.blocking: return f"Started {s.name} in the background."
+        try:
+            future.result(timeout=s.timeout)
+        except FutureTimeout:
+            pass
+        with lock:
+            # Either it finished in time (or just now), or on_done gets it later
+            if state["finished"]: return state["result"]
+            state["late"] = True
+        return f"{s.name} is still running, will report back."
@@ -0,0 +1,202 @@
+import re
+import time
+import zlib
+
+from core.lazy import LazyModule
+
+np = LazyModule("numpy", optional=True)
+
+CONFIDENT = 0.85  # Local answers at or above this skip the remote router
+
+# --- TIER 1: COMPILED PATTERNS ---
+# Each rule: (regex, builder(match) -> intent, confidence)
+def _num(m, group='n'):
+    try: return int(m.group(group))
+    except (TypeError, ValueError): return None
+
+RULES = [
+    (r"^(?:set |turn |change )?(?:the )?(?:volume|vol)(?: to| at)? (?P<n>\d{1,3})\s*%?$",
+        lambda m: {"action": "system", "target": "vol_set", "value": _num(m)}, 0.98),
+    (r"^(?:set |turn |change )?(?:the )?brightness(?: to| at)? (?P<n>\d{1,3})\s*%?$",
+        lambda m: {"action": "system", "target": "bright_set", "value": _num(m)}, 0.98),
+    (r"^(?:mute|unmute)(?: (?:the )?(?:volume|sound|audio))?$",
+        lambda m: {"action": "system", "target": "mute", "value": None}, 0.97),
+    (r"^(?:what(?:'s| is) the )?(?:time|date|day)(?: is it)?(?: (?:right )?now| today)?$"
+     r"|^what (?:time|day|date) is it(?: (?:right )?now| today)?$",
+        lambda m: {"action": "system", "target": "date", "value": None}, 0.97),
+    (r"^(?:what(?:'s| is) )?my ip(?: address)?$",
+        lambda m: {"action": "system", "target": "ip", "value": None}, 0.97),
+    (r"^lock(?: the| my)? (?:screen|computer|pc)$",
+        lambda m: {"action": "system", "target": "lock", "value": None}, 0.97),
+    (r"^(?:take a )?screenshot$",
+        lambda m: {"action": "system", "target": "screen", "value": None}, 0.95),
+    (r"^(?:open|launch|start|run) (?:up )?(?:the )?"
+     r"(?!(?:a|an|my|new|some) )(?!.*\b(?:report|note|folder|website|site|file|url|www)\b)(?!.*\.\w{2,}$)"
+     r"(?P<app>[\w .+-]{2,40}?)(?: app)?$",
+        lambda m: {"action": "open", "target": m.group('app').strip()}, 0.92),
+    (r"^(?:what did i (?:note|write down|jot down)|(?:search|check|find|look through|show me) (?:in )?my notes)"
+     r"(?: (?:about|on|for|regarding))? (?P<q>.+)$",
+        lambda m: {"action": "recall", "target": m.group('q').strip(), "value": None}, 0.95),
+    (r"^(?:take|make|write|save) (?:a )?note[:,]? (?:that )?(?P<text>.+)$"
+     r"|^note(?: that|:) (?P<text2>.+)$",
+        lambda m: {"action": "note", "target": (m.group('text') or m.group('text2')).strip()}, 0.95),
+]
+# Rules run on the message as typed (case and punctuation kept: note text is the user's own words);
+# trailing .!? are allowed after whatever a rule ends with
+RULES = [(re.compile(p.replace("$", r"[.!?]*$"), re.IGNORECASE), build, conf) for p, build, conf in RULES]
+
+# Words that hint at an action. Messages with none of them are plain chat.
+# Every router action needs its verbs here, or requests for it never reach Gemini.
+ACTION_WORDS = frozenset("""
+open launch start run close kill quit exit volume vol mute unmute louder quieter brightness bright
+dim note notes noted remember write wrote jot recall report reports research search find look lookup google
+browse website url folder directory job jobs cancel running
+lock screenshot screen shutdown shut restart minimize maximize min max time date day ip play pause next
+turn computer pc go
+""".split())
+WORD = re.compile(r"[a-z0-9']+")
+DOMAIN = re.compile(r"\w\.(?:com|org|net|io|dev|gov|edu|co)\b")
+
+def normalize(text):
+    return ' '.join(text.lower().strip().rstrip('.!?').split())
+
+# --- TIER 2: VECTOR SIMILARITY (optional, NumPy) ---
+EXAMPLES = {
+    "chat": ["hi luna", "how are you", "tell me a joke", "what do you think about cats",
+             "i am bored", "thank you so much", "good morning", "who are you"],
+    "report": ["make a report on quantum mechanics", "research the history of rome",
+               "write a detailed report about black holes", "can you research electric cars for me"],
+    "note": ["take a note buy milk", "remember that i have a meeting at five",
+             "write this down call mom", "note that the wifi password is changed"],
+    "recall": ["what did i note about the meeting", "search my notes for the wifi password",
+               "show me my notes from last week", "did i write anything down about groceries"],
+    "browse": ["go to youtube.com", "open the website github.com", "browse to reddit"],
+    "open": ["open spotify", "launch chrome", "start visual studio code", "can you open discord"],
+    "kill": ["close spotify", "kill chrome", "quit discord", "shut down notepad"],
+    "folder": ["create a folder called projects", "make a new folder named music"],
+    "system": ["turn the volume up", "set volume to 30", "make the screen brighter",
+               "minimize everything", "lock my pc", "what time is it", "take a screenshot",
+               "shut down the computer"],
+}
+
+class SimilarityModel:
+    """Hashed character-trigram vectors with cosine nearest-example lookup."""
+    def __init__(self, examples=EXAMPLES, dims=2048):
+        self.dims = dims
+        self.labels = []
+        rows = []
+        for action, utterances in examples.items():
+            for u in utterances:
+                self.labels.append(action)
+                rows.append(self._vector(u))
+        self.matrix = np.vstack(rows)
+
+    def _vector(self, text):
+        v = np.zeros(self.dims, dtype=np.float32)
+        t = f"  {normalize(text)}  "
+        for i in range(len(t) - 2): v[zlib.crc32(t[i:i + 3].encode()) % self.dims] += 1.0
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+    def classify(self, text):
+        """Returns (action, score, margin over the best different action)."""
+        scores = self.matrix @ self._vector(text)
+        order = np.argsort(-scores)
+        best = self.labels[order[0]]
+        runner_up = next((scores[i] for i in order[1:] if self.labels[i] != best), 0.0)
+        return best, float(scores[order[0]]), float(scores[order[0]] - runner_up)
+
+# --- TIERED ROUTER ---
+class IntentRouter:
+    """
+    Settles confident requests locally and only escalates ambiguous ones
+    to the remote (Gemini) router.
+    """
+    def __init__(self, remote=None, use_vectors=True, threshold=CONFIDENT, cache=None, is_app=None):
+        self.remote = remote
+        self.is_app = is_app  # fn(name) -> True for a known app name; "open X" only settles locally for those
+        self.threshold = threshold
+        self.cache = cache
+        self.use_vectors = use_vectors
+        self.model = None
+        self.counts = {"rules": 0, "chat": 0, "vector": 0, "cache": 0, "remote": 0}
+
+    def warm(self):
+        """Builds the similarity model (imports NumPy) ahead of the first ambiguous request."""
+        if self.use_vectors and self.model is None and np: self.model = SimilarityModel()
+        return self
+
+    def classify_local(self, text):
+        """Returns (intent, confidence, tier) without touching the network."""
+        clean = normalize(text)
+        typed = ' '.join(text.split())
+        for pattern, build, conf in RULES:
+            m = pattern.match(typed)
+            if not m: continue
+            intent = build(m)
+            # "start over", "open the door": the words fit, but only a name we know is an app
+            if intent['action'] == "open" and not (self.is_app and self.is_app(intent['target'])):
+                return {"action": "chat"}, 0.0, None
+            return intent, conf, "rules"
+
+        if not (set(WORD.findall(clean)) & ACTION_WORDS) and not DOMAIN.search(clean):
+            return {"action": "chat"}, 0.9, "chat"
+
+        # Vectors are only trusted to say "this is chat"; actions need a target,
+        # which is what the remote router extracts.
+        if self.use_vectors and self.model is None: self.warm()
+        if self.model is not None:
+            action, score, margin = self.model.classify(clean)
+            if action == "chat" and score > 0.6 and margin > 0.15:
+                return {"action": "chat"}, min(0.99, score + margin), "vector"
+        return {"action": "chat"}, 0.0, None
+
+    def route(self, text):
+        intent, conf, tier = self.classify_local(text)
+        if conf >= self.threshold or self.remote is None:
+            self.counts[tier or "chat"] += 1
+            return intent
+
+        key = normalize(text)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.counts["cache"] += 1
+                return cached
+
+        self.counts["remote"] += 1
+        start = time.perf_counter()
+        intent = self.remote(text)
+        # None means the remote router failed: fall back to chat, never cache it
+        if intent is None: return {"action": "chat"}
+        if self.cache is not None: self.cache.put(key, intent, time.perf_counter() - start)
+        return intent
+
+def benchmark(cases, router=None, repeat=50):
+    """
+    Offline accuracy/latency of the local tiers over (utterance, expected_action) pairs.
+    Escalated cases count as neither right nor wrong.
+    """
+    router = (router or IntentRouter()).warm()
+    correct = wrong = escalated = 0
+    mistakes = []
+    for text, expected in cases:
+        intent, conf, _ = router.classify_local(text)
+        if conf < router.threshold: escalated += 1
+        elif intent["action"] == expected: correct += 1
+        else:
+            wrong += 1
+            mistakes.append((text, expected, intent["action"]))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _ in cases: router.classify_local(text)
+    per_call = (time.perf_counter() - start) / (repeat * len(cases))
+
+    decided = correct + wrong
+    return {
+        "cases": len(cases), "settled_locally": decided, "escalated": escalated,
+        "local_precision": correct / decided if decided else 0.0,
+        "mistakes": mistakes, "avg_latency_us": per_call * 1e6,
+        "vectors": router.model is not None
+    }
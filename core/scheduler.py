@@ -0,0 +1,132 @@
+import itertools
+import queue
+import statistics
+import threading
+import time
+
+# Lower number runs first
+PRIORITY_USER = 0
+PRIORITY_SKILL = 1      # a background skill finished and Luna reports the result
+PRIORITY_AUTONOMY = 2
+MAX_QUEUE = 16
+_turn_ids = itertools.count(1)
+
+class CancelToken:
+    """Cooperative cancellation: work checks `cancelled` and registers stop hooks."""
+    def __init__(self):
+        self.id = next(_turn_ids)  # names the turn in UI ops, so API clients can pick out their own
+        self._event = threading.Event()
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self): return self._event.is_set()
+
+    def on_cancel(self, hook):
+        with self._lock:
+            if not self._event.is_set():
+                self._hooks.append(hook)
+                return
+        hook()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set(): return
+            self._event.set()
+            hooks, self._hooks = self._hooks, []
+        for hook in hooks:
+            try: hook()
+            except Exception as e: print(f"[Scheduler] Cancel hook failed: {e}")
+
+class TurnScheduler:
+    """
+    One bounded priority queue and one worker, so Brain.history is only ever
+    touched by a single turn at a time. User input outranks autonomy events
+    and barges in on whatever is running.
+    """
+    def __init__(self, max_queue=MAX_QUEUE):
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._current = None  # (priority, CancelToken)
+        self._pending = []  # tokens of queued jobs, so barge-in can drop stale autonomy work
+        self._waits = []
+        self.counts = {"submitted": 0, "completed": 0, "dropped": 0, "cancelled": 0}
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, priority, fn, *args, barge_in=False, on_skip=None):
+        """
+        Queues fn(*args, cancel=token). Returns the token, or None if the job was dropped.
+        barge_in cancels the running job and any queued lower-priority work.
+        on_skip(token) runs instead of fn if the job is cancelled before it starts.
+        """
+        token = CancelToken()
+        with self._lock:
+            self.counts["submitted"] += 1
+            if barge_in:
+                if self._current: self._current[1].cancel()
+                for p, t in self._pending:
+                    if p > priority: t.cancel()
+            try:
+                self._queue.put_nowait((priority, next(self._order), time.monotonic(), token, fn, args, on_skip))
+            except queue.Full:
+                self.counts["dropped"] += 1
+                print("[Scheduler] Queue full, dropping job.")
+                return None
+            self._pending.append((priority, token))
+        return token
+
+    def cancel_current(self):
+        with self._lock:
+            if self._current: self._current[1].cancel()
+
+    def close(self):
+        """Cancels the running and queued turns; the worker exits once the current one returns."""
+        with self._lock:
+            if self._current: self._current[1].cancel()
+            for _, t in self._pending: t.cancel()
+        # The worker stops at the sentinel: whatever is still queued never starts
+        while True:
+            try: item = self._queue.get_nowait()
+            except queue.Empty: break
+            self._skip(item[3], item[6])
+        self._queue.put((PRIORITY_USER - 1, next(self._order), 0.0, None, None, (), None))  # ahead of everything
+
+    def metrics(self):
+        with self._lock:
+            waits = list(self._waits)
+            return dict(self.counts,
+                depth=self._queue.qsize(),
+                busy=self._current is not None,
+                wait_p50_ms=round(statistics.median(waits) * 1000, 1) if waits else None,
+                wait_max_ms=round(max(waits) * 1000, 1) if waits else None)
+
+    def _worker(self):
+        while True:
+            priority, _, queued_at, token, fn, args, on_skip = self._queue.get()
+            if fn is None: return
+            with self._lock:
+                self._pending = [(p, t) for p, t in self._pending if t is not token]
+                skipped = token.cancelled
+                if not skipped:
+                    self._current = (priority, token)
+                    self._waits.append(time.monotonic() - queued_at)
+                    if len(self._waits) > 200: del self._waits[0]
+            if skipped:
+                self._skip(token, on_skip)
+                continue
+            try:
+                fn(*args, cancel=token)
+            except Exception as e:
+                print(f"[Scheduler] Job failed: {e}")
+            with self._lock:
+                self._current = None
+                self.counts["cancelled" if token.cancelled else "completed"] += 1
+
+    def _skip(self, token, on_skip):
+        with self._lock:
+            self._pending = [(p, t) for p, t in self._pending if t is not token]
+            self.counts["cancelled"] += 1
+        if on_skip:
+            try: on_skip(token)
+            except Exception as e: print(f"[Scheduler] Skip hook failed: {e}")
@@ -0,0 +1,176 @@
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+import numpy as np
+
+MEMORY_DIR = "core/semantic"
+EMBED_MODEL = "nomic-embed-text"  # `ollama pull nomic-embed-text`; falls back to hashing if missing
+EMBED_TIMEOUT = 5  # seconds; an embedding call that hangs must not pin the recall worker
+MAX_MEMORIES = 200_000  # ring buffer: the oldest memories are overwritten past this
+RECALL_K = 3
+RECALL_MIN_SCORE = 0.35
+INITIAL_ROWS = 1024
+
+# --- EMBEDDERS ---
+class HashingEmbedder:
+    """Local stand-in: hashed character trigrams. No model needed, weak but instant."""
+    def __init__(self, dims=256):
+        self.dims = dims
+        self.name = f"hash3-{dims}"
+
+    def embed(self, text, kind="embed"):
+        v = np.zeros(self.dims, dtype=np.float32)
+        t = f"  {' '.join(text.lower().split())}  "
+        for i in range(len(t) - 2): v[zlib.crc32(t[i:i + 3].encode()) % self.dims] += 1.0
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+class OllamaEmbedder:
+    """
+    Embeddings from Ollama's embedding endpoint, through a pooled LLMSession:
+    kept resident like the chat model and queued behind user turns by its limiter.
+    """
+    def __init__(self, model=EMBED_MODEL, session=None):
+        from core.llm import LLMSession
+        self.session = session or LLMSession(model, tier="embed", options={}, timeout=EMBED_TIMEOUT)
+        self.model = model
+        self.name = f"ollama:{model}"
+        self.dims = len(self.embed("hello"))
+
+    def embed(self, text, kind="embed"):
+        """kind "recall" is a user turn's lookup; "embed" (indexing) waits for replies to finish."""
+        v = np.asarray(self.session.embed(text, kind), dtype=np.float32)
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+def create_embedder(model=EMBED_MODEL):
+    try: return OllamaEmbedder(model)
+    except Exception as e:
+        print(f"[Memory] Embedding model unavailable ({e}), using local hashing embedder.")
+        return HashingEmbedder()
+
+# --- INDEX ---
+class MemoryIndex:
+    """
+    Top-k cosine search over a memory-mapped float32 matrix (one row per memory).
+    Rows are unit length, so cosine similarity is a single matrix-vector product.
+    Text lives in an append-only JSONL sidecar; both are updated incrementally.
+    """
+    def __init__(self, embedder, path=MEMORY_DIR, capacity=MAX_MEMORIES):
+        self.embedder = embedder
+        self.capacity = capacity
+        self.dims = embedder.dims
+        self.vec_path = os.path.join(path, "vectors.npy")
+        self.entries_path = os.path.join(path, "entries.jsonl")
+        self.meta_path = os.path.join(path, "meta.json")
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._open()
+        threading.Thread(target=self._index_loop, daemon=True).start()
+
+    def _open(self):
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as f: meta = json.load(f)
+        fresh = meta.get('embedder') != self.embedder.name or not os.path.exists(self.vec_path)
+        if fresh:
+            # A different embedder means incomparable vectors: start over
+            for p in (self.vec_path, self.entries_path):
+                if os.path.exists(p): os.remove(p)
+            with open(self.meta_path, 'w') as f: json.dump({'embedder': self.embedder.name, 'dims': self.dims}, f)
+            self.vectors = np.lib.format.open_memmap(self.vec_path, mode='w+', dtype=np.float32,
+                                                     shape=(min(INITIAL_ROWS, self.capacity), self.dims))
+        else:
+            self.vectors = np.lib.format.open_memmap(self.vec_path, mode='r+')
+        self.entries = [None] * len(self.vectors)
+        self.count = 0
+        lines = 0
+        if os.path.exists(self.entries_path):
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: entry = json.loads(line)
+                    except ValueError: break  # torn last line after a crash
+                    lines += 1
+                    slot = entry['n'] % self.capacity
+                    if slot < len(self.entries): self.entries[slot] = entry
+                    self.count = max(self.count, entry['n'] + 1)
+        # Overwritten ring slots leave dead lines behind; rewrite once they pile up
+        if lines > 2 * self.capacity: self._compact()
+
+    def __len__(self): return min(self.count, self.capacity)
+
+    # --- WRITES ---
+    def add(self, text, kind="chat", **meta):
+        self.add_vectors([text], self.embedder.embed(text)[None, :], kind, **meta)
+
+    def add_async(self, text, kind="chat", **meta):
+        """Embeds and indexes off the calling thread (embedding is a model call)."""
+        self._queue.put((text, kind, meta))
+
+    def add_vectors(self, texts, vectors, kind="chat", **meta):
+        """Bulk insert of pre-computed unit vectors (also used by the benchmark)."""
+        with self._lock:
+            lines = []
+            for text, vector in zip(texts, vectors):
+                slot = self.count % self.capacity
+                if slot >= len(self.vectors): self._grow()
+                self.vectors[slot] = vector
+                entry = {'n': self.count, 't': time.time(), 'kind': kind, 'text': text, **meta}
+                self.entries[slot] = entry
+                lines.append(json.dumps(entry))
+                self.count += 1
+            self.vectors.flush()
+            with open(self.entries_path, 'a', encoding='utf-8') as f: f.write("\n".join(lines) + "\n")
+
+    def _grow(self):
+        rows = min(self.capacity, len(self.vectors) * 2)
+        tmp = self.vec_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(rows, self.dims))
+        grown[:len(self.vectors)] = self.vectors
+        grown.flush()
+        del grown
+        self.vectors = None  # release the old mapping before replacing the file
+        os.replace(tmp, self.vec_path)
+        self.vectors = np.lib.format.open_memmap(self.vec_path, mode='r+')
+        self.entries += [None] * (rows - len(self.entries))
+
+    def _compact(self):
+        live = sorted((e for e in self.entries if e), key=lambda e: e['n'])
+        tmp = self.entries_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entry in live: f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.entries_path)
+
+    def _index_loop(self):
+        while True:
+            text, kind, meta = self._queue.get()
+            try: self.add(text, kind, **meta)
+            except Exception as e: print(f"[Memory] Indexing failed: {e}")
+
+    # --- SEARCH ---
+    def recall(self, text, exclude=()):
+        """The few memories worth putting in the prompt for `text`."""
+        return self.search_vector(self.embedder.embed(text, "recall"), RECALL_K, RECALL_MIN_SCORE, exclude)
+
+    def search(self, query, k=RECALL_K, min_score=0.0, exclude=()):
+        return self.search_vector(self.embedder.embed(query), k, min_score, exclude)
+
+    def search_vector(self, q, k=RECALL_K, min_score=0.0, exclude=()):
+        with self._lock:
+            n = len(self)
+            if n == 0: return []
+            scores = self.vectors[:n] @ q
+            # Over-fetch a little so excluded/empty slots don't leave us short
+            want = min(n, k + len(exclude) + 4)
+            top = np.argpartition(-scores, want - 1)[:want]
+            results = []
+            for i in top[np.argsort(-scores[top])]:
+                entry = self.entries[i]
+                if entry is None or scores[i] < min_score or entry['text'] in exclude: continue
+                results.append((float(scores[i]), entry))
+                if len(results) == k: break
+            return results
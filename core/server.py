@@ -0,0 +1,395 @@
+"""
+Local HTTP + WebSocket API for Luna. The pywebview window is one client;
+scripts, load tests and other frontends can be more.
+
+  GET    /                          the chat UI (assets/index.html)
+  GET    /ws?session=ID             WebSocket: {"type": "message"|"stop", ...} in, {"type": "ops", "ops": [...]} out;
+                                    without ?session the socket gets a session of its own, closed with it
+  GET    /sessions                  list sessions
+  POST   /sessions                  new session {"speak": false} -> {"id": ...}
+  DELETE /sessions/ID
+  GET    /sessions/ID/history       messages of the session's working window; with ?before=MSG_ID&limit=50
+                                    (and optionally &conversation=C) pages back through saved messages, newest first
+  GET    /sessions/ID/conversations past conversations saved to disk ?limit=20&offset=0
+  POST   /sessions/ID/messages      {"text": ..., "stream": true} -> NDJSON ops of this turn until it completes;
+                                    "stream": false -> {"reply", "skills", "interrupted"}; 429 if the turn queue is full
+  POST   /sessions/ID/stop          interrupt the current reply
+  GET    /jobs, POST /jobs/ID/cancel
+  GET    /metrics                   trace summary, model tiers, router and intent cache, and per
+                                    session: speculation, turn queue, context window
+  POST   /metrics/trace?format=chrome|jsonl
+
+Ops are the UIBridge protocol: begin, chunk, status, subsystem, message, skill, job, complete;
+begin and complete carry the turn id, so a client can tell its own turn from others on the session.
+Run headless with:  python main.py --headless
+
+Every API call needs the per-launch token ("Authorization: Bearer <token>", or ?token= on /ws);
+it is printed at startup, or set it with the LUNA_TOKEN environment variable. Request bodies
+must be application/json, and requests from other origins (any web page the user visits) are refused.
+"""
+import argparse
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import secrets
+import threading
+from aiohttp import web, WSMsgType
+from core.brain import Brain, MODEL_NAME, SMALL_MODEL, SMALL_OPTIONS
+from core.llm import LLMSession
+from core.skills import SkillSet
+from core.tracing import TRACER
+
+HOST = "127.0.0.1"  # local only
+TOKEN_ENV = "LUNA_TOKEN"  # fixed token for scripts; otherwise a random one per launch
+PORT = 8765
+MAX_SESSIONS = 32
+DESKTOP = "desktop"  # the window's session: voice, persistent history, autonomy
+TURN_TIMEOUT = 300   # seconds a streamed HTTP reply may take
+DESKTOP_WAIT = 60    # seconds a client of the desktop session waits for the window's Brain
+PAGE_MAX = 200       # most saved messages or conversations one history request returns
+ASSETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+class Session:
+    """One conversation (a Brain) and the clients listening to it."""
+    def __init__(self, sid, loop):
+        self.id = sid
+        self.loop = loop
+        self.brain = None
+        self.listeners = set()  # asyncio.Queue per client
+        self.connected = threading.Event()  # the Brain holds its UI ops until the first client
+
+    def publish(self, ops):
+        """UIBridge sink; runs on the bridge thread."""
+        self.loop.call_soon_threadsafe(self._fanout, ops)
+
+    def _fanout(self, ops):
+        for q in list(self.listeners): q.put_nowait(ops)
+
+    def subscribe(self):
+        q = asyncio.Queue()
+        self.listeners.add(q)
+        self.connected.set()
+        return q
+
+    def unsubscribe(self, q):
+        self.listeners.discard(q)
+
+    def info(self):
+        return {"id": self.id, "clients": len(self.listeners), "speaks": self.brain.voice is not None,
+                "messages": len(self.brain.history) - 1, "startup": self.brain.startup.status()}
+
+class LunaServer:
+    """
+    Owns what sessions share: one LLMSession per model tier (pooled Ollama
+    clients, so every session reuses the same connections and resident models;
+    the LIMITER in core/llm.py spans them all) and one SkillSet.
+    Each session gets its own Brain, history and turn scheduler.
+    """
+    def __init__(self, host=HOST, port=PORT, model=MODEL_NAME, max_sessions=MAX_SESSIONS, token=None,
+                 desktop=False):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.token = token or os.environ.get(TOKEN_ENV) or secrets.token_urlsafe(24)
+        self.llm = LLMSession(model)
+        self.quick = LLMSession(SMALL_MODEL, tier="small", options=SMALL_OPTIONS) if SMALL_MODEL else None
+        self.skills = SkillSet()
+        self.skills.jobs.on_done = self._on_job_done
+        self.sessions = {}
+        self.desktop = desktop  # open_desktop() will be called: its clients wait for it
+        self._desktop_open = None  # asyncio.Event, set once the desktop session exists
+        self.loop = None
+        self.ready = threading.Event()
+        self._ids = itertools.count(1)
+        self.app = self._build_app()
+
+    @property
+    def url(self): return f"http://{self.host}:{self.port}"
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Serves on a background thread; returns once the port is open."""
+        threading.Thread(target=self.run, name="server", daemon=True).start()
+        self.ready.wait()
+        return self
+
+    def run(self):
+        """Serves on this thread until the process exits."""
+        self.llm.warm_async()
+        # Once for all sessions; each Brain's "skills" stage then only waits for it
+        threading.Thread(target=self.skills.warm, name="skills-warm", daemon=True).start()
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._desktop_open = asyncio.Event()
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        self.port = runner.addresses[0][1]  # port=0 picks a free one
+        print(f"[Server] Listening on {self.url} (browser: {self.url}/#token={self.token})")
+        self.ready.set()
+        await asyncio.Event().wait()
+
+    def shutdown(self):
+        for sid in list(self.sessions): self.close_session(sid)
+
+    # --- SESSIONS ---
+    def open_desktop(self):
+        """The window's session (call after start())."""
+        session = Session(DESKTOP, self.loop)
+        session.brain = Brain(llm=self.llm, skills=self.skills, sink=session.publish, ui_ready=session.connected,
+                              quick=self.quick)
+        self.sessions[DESKTOP] = session
+        self.loop.call_soon_threadsafe(self._desktop_open.set)
+        session.brain.start_life()
+        return session.brain
+
+    def create_session(self, speak=False):
+        if len(self.sessions) >= self.max_sessions: return None
+        sid = f"s{next(self._ids)}"
+        session = Session(sid, self.loop)
+        session.brain = Brain(llm=self.llm, skills=self.skills, sink=session.publish,
+                              ui_ready=session.connected, session=sid, speak=speak)
+        self.sessions[sid] = session
+        print(f"[Server] Session {sid} opened ({len(self.sessions)} active)")
+        return session
+
+    def close_session(self, sid):
+        session = self.sessions.pop(sid, None)
+        if session:
+            session.brain.shutdown()
+            print(f"[Server] Session {sid} closed ({len(self.sessions)} active)")
+        return session is not None
+
+    def _on_job_done(self, job):
+        # Runs on a job thread: hand the result to the session whose turn started it
+        session = self.sessions.get(job.get('owner') or DESKTOP)
+        if session: session.brain._on_job_done(job)
+
+    # --- HTTP ---
+    def _build_app(self):
+        app = web.Application(middlewares=[self._guard])
+        app.add_routes([
+            web.get("/", self._index),
+            web.static("/assets", ASSETS),
+            web.get("/ws", self._websocket),
+            web.get("/sessions", self._list_sessions),
+            web.post("/sessions", self._create_session),
+            web.delete("/sessions/{sid}", self._delete_session),
+            web.get("/sessions/{sid}/history", self._history),
+            web.get("/sessions/{sid}/conversations", self._conversations),
+            web.post("/sessions/{sid}/messages", self._message),
+            web.post("/sessions/{sid}/stop", self._stop),
+            web.get("/jobs", self._jobs),
+            web.post("/jobs/{job_id}/cancel", self._cancel_job),
+            web.get("/metrics", self._metrics),
+            web.post("/metrics/trace", self._export_trace),
+        ])
+        return app
+
+    @web.middleware
+    async def _guard(self, request, handler):
+        """
+        Any page open in the user's browser can reach 127.0.0.1: the Host must be ours
+        (DNS rebinding), an Origin must be ours, bodies must be JSON (no cross-site
+        "simple" POSTs) and everything but the page itself needs the token.
+        """
+        if self.host not in ("0.0.0.0", "::") and request.host not in self._hosts():
+            raise web.HTTPForbidden(text="Unknown host")
+        origin = request.headers.get("Origin")
+        if origin is not None and origin != f"http://{request.host}":
+            raise web.HTTPForbidden(text="Cross-origin requests are not allowed")
+        if request.path == "/" or request.path.startswith("/assets/"): return await handler(request)
+        if request.method == "POST" and request.can_read_body and request.content_type != "application/json":
+            raise web.HTTPUnsupportedMediaType(text="Request bodies must be application/json")
+        if not self._authorized(request): raise web.HTTPUnauthorized(text="Missing or wrong token")
+        return await handler(request)
+
+    def _hosts(self):
+        return {f"{host}:{self.port}" for host in (self.host, "127.0.0.1", "localhost", "[::1]")}
+
+    def _authorized(self, request):
+        auth = request.headers.get("Authorization", "")
+        if auth.startswith("Bearer "): token = auth[7:]
+        # Browsers cannot set headers on a WebSocket, so /ws may pass it in the query
+        elif request.path == "/ws": token = request.query.get("token", "")
+        else: return False
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def _find(self, sid):
+        session = self.sessions.get(sid)
+        if session is None and sid == DESKTOP and self.desktop:
+            # The page can connect before the window's Brain is built: wait for it, never stand in a new one
+            try: await asyncio.wait_for(self._desktop_open.wait(), DESKTOP_WAIT)
+            except asyncio.TimeoutError: pass
+            session = self.sessions.get(sid)
+        return session
+
+    async def _session(self, request):
+        session = await self._find(request.match_info['sid'])
+        if session is None: raise web.HTTPNotFound(text="No such session")
+        return session
+
+    async def _index(self, request):
+        return web.FileResponse(os.path.join(ASSETS, "index.html"))
+
+    async def _list_sessions(self, request):
+        return web.json_response([s.info() for s in self.sessions.values()])
+
+    async def _create_session(self, request):
+        body = await request.json() if request.can_read_body else {}
+        # Building a Brain touches disk and starts threads: keep it off the event loop
+        session = await self.loop.run_in_executor(None, self.create_session, bool(body.get('speak')))
+        if session is None: raise web.HTTPTooManyRequests(text=f"At most {self.max_sessions} sessions")
+        return web.json_response({"id": session.id}, status=201)
+
+    async def _delete_session(self, request):
+        if request.match_info['sid'] == DESKTOP: raise web.HTTPForbidden(text="The desktop session stays open")
+        ok = await self.loop.run_in_executor(None, self.close_session, request.match_info['sid'])
+        if not ok: raise web.HTTPNotFound(text="No such session")
+        return web.json_response({"closed": True})
+
+    async def _history(self, request):
+        brain = (await self._session(request)).brain
+        if 'before' not in request.query:
+            return web.json_response([m for m in brain.history if m['role'] != 'system'])
+        # Scrolling back: only the desktop session saves to disk, the others have nothing older
+        before = self._int_query(request, 'before', None)
+        limit = min(self._int_query(request, 'limit', 50), PAGE_MAX)
+        messages = await self.loop.run_in_executor(None, brain.older_messages, before, limit,
+                                                   request.query.get('conversation'))
+        return web.json_response(messages)
+
+    async def _conversations(self, request):
+        brain = (await self._session(request)).brain
+        limit = min(self._int_query(request, 'limit', 20), PAGE_MAX)
+        offset = self._int_query(request, 'offset', 0)
+        return web.json_response(await self.loop.run_in_executor(None, brain.conversations, limit, offset))
+
+    def _int_query(self, request, name, default):
+        value = request.query.get(name, "")
+        if not value: return default
+        try: number = int(value)
+        except ValueError: raise web.HTTPBadRequest(text=f"'{name}' must be an integer")
+        if number < 0: raise web.HTTPBadRequest(text=f"'{name}' must not be negative")
+        return number
+
+    async def _stop(self, request):
+        brain = (await self._session(request)).brain
+        brain.speech.stop()
+        brain.scheduler.cancel_current()
+        return web.json_response({"stopped": True})
+
+    async def _message(self, request):
+        session = await self._session(request)
+        body = await request.json()
+        text = (body.get('text') or "").strip()
+        if not text: raise web.HTTPBadRequest(text="Missing 'text'")
+        q = session.subscribe()
+        try:
+            turn = session.brain.submit_input(text)
+            if turn is None: raise web.HTTPTooManyRequests(text="Too many messages queued, try again shortly")
+            if body.get('stream', True):
+                response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+                await response.prepare(request)
+                try:
+                    async for ops in self._turn_ops(q, turn.id):
+                        await response.write((json.dumps(ops) + "\n").encode())
+                except asyncio.TimeoutError: pass  # the stream just ends without 'complete'
+                await response.write_eof()
+                return response
+            reply, skills = "", []
+            try:
+                async for ops in self._turn_ops(q, turn.id):
+                    reply += "".join(op[1] for op in ops if op[0] == "chunk")
+                    skills += [{"action": op[1], "result": op[2]} for op in ops if op[0] == "skill"]
+            except asyncio.TimeoutError:
+                raise web.HTTPGatewayTimeout(text=f"No reply within {TURN_TIMEOUT}s")
+            # A later message barges in: this reply stops where it got to
+            return web.json_response({"reply": reply, "skills": skills, "interrupted": turn.cancelled})
+        finally:
+            session.unsubscribe(q)
+
+    async def _turn_ops(self, q, turn):
+        """
+        Ops of one turn, from its 'begin' to its 'complete'. Other clients' turns and
+        autonomy share the session's stream: their ops are left out. Raises asyncio.TimeoutError.
+        """
+        loop, deadline = self.loop, self.loop.time() + TURN_TIMEOUT
+        started = False
+        while True:
+            batch = await asyncio.wait_for(q.get(), max(0, deadline - loop.time()))
+            ops = []
+            for op in batch:
+                if op[0] == "begin": started = started or op[1:] == [turn]
+                if started: ops.append(op)
+                if started and op[0] == "complete" and op[1:] == [turn]:
+                    yield ops
+                    return
+            if ops: yield ops
+
+    async def _jobs(self, request):
+        return web.json_response(self.skills.jobs.list())
+
+    async def _cancel_job(self, request):
+        ok = self.skills.jobs.cancel(request.match_info['job_id'])
+        return web.json_response({"status": "cancelled" if ok else "not running"})
+
+    async def _metrics(self, request):
+        tiers = [llm.report() for llm in (self.llm, self.quick) if llm]
+        sessions = {sid: s.brain.metrics() for sid, s in list(self.sessions.items())}
+        router = {"tiers": self.skills.router.counts, "intent_cache": self.skills.intent_cache.stats()}
+        return web.json_response({"trace": TRACER.summary(), "llm": tiers, "router": router, "sessions": sessions})
+
+    async def _export_trace(self, request):
+        path = await self.loop.run_in_executor(None, TRACER.export, request.query.get('format', 'chrome'))
+        return web.json_response({"path": path})
+
+    # --- WEBSOCKET ---
+    async def _websocket(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        sid = request.query.get('session')
+        owned = not sid  # no session asked for: this socket gets its own, closed when it disconnects
+        if owned:
+            session = await self.loop.run_in_executor(None, self.create_session, False)
+            if session is None:
+                await ws.close(message=b"Too many sessions")
+                return ws
+        else:
+            session = await self._find(sid)
+            if session is None:
+                await ws.close(message=b"No such session")
+                return ws
+        q = session.subscribe()
+        await ws.send_json({"type": "hello", "session": session.id})
+
+        async def forward():
+            while True: await ws.send_json({"type": "ops", "ops": await q.get()})
+
+        sender = asyncio.create_task(forward())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT: continue
+                try: data = json.loads(msg.data)
+                except ValueError: continue
+                if data.get('type') == "message" and data.get('text', "").strip():
+                    session.brain.submit_input(data['text'].strip())
+                elif data.get('type') == "stop":
+                    session.brain.speech.stop()
+                    session.brain.scheduler.cancel_current()
+        finally:
+            sender.cancel()
+            session.unsubscribe(q)
+            if owned: await self.loop.run_in_executor(None, self.close_session, session.id)
+        return ws
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Luna headless server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    LunaServer(args.host, args.port).run()
@@ -1,5 +1,3 @@
-import pyautogui
-import psutil
 import time
 import os
 import datetime
@@ -7,62 +5,118 @@ import webbrowser
 import subprocess
 import json  # <--- FIXED: Added missing import
 import socket
-import requests # For IP check
-from plyer import notification
-from google import genai
-from google.genai import types
-import comtypes
 import shutil
+import threading
+from core.lazy import LazyModule
+from core.router import IntentRouter
+from core.intent_cache import IntentCache
+from core.registry import SkillRegistry, skill
+from core.jobs import JobManager
+from core.notes import NoteStore, split_when, parse_when
+from core.apps import AppResolver, ALIASES
 
 # --- API KEY ---
 GOOGLE_API_KEY = "Enter_Your_Gemini_API_Key_Here"
 
+# --- HEAVY DEPENDENCIES (imported on first use, see SkillSet.warm) ---
+pyautogui = LazyModule("pyautogui")
+psutil = LazyModule("psutil")
+requests = LazyModule("requests")  # For IP check
+plyer = LazyModule("plyer")
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
+
 # --- OPTIONAL DEPENDENCIES ---
-try: import screen_brightness_control as sbc
-except ImportError: sbc = None
-try: import pygetwindow as gw
-except ImportError: gw = None
-try: import pyperclip
-except ImportError: pyperclip = None
-try:
-    from comtypes import CLSCTX_ALL
-    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-except ImportError: AudioUtilities = None
+sbc = LazyModule("screen_brightness_control", optional=True)
+gw = LazyModule("pygetwindow", optional=True)
+pyperclip = LazyModule("pyperclip", optional=True)
+pycaw = LazyModule("pycaw.pycaw", optional=True)
+
+# --- SYSTEM COMMANDS ---
+# Exact command -> handler key; the router prompt lists these names.
+SYSTEM_COMMANDS = ("vol_set", "bright_set", "mute", "vol_up", "vol_down", "bright_up", "bright_down",
+                   "min", "max", "close", "lock", "screen", "shutdown", "play", "next", "date", "ip")
+# Spellings the model (or inline tags like [MINIMIZE]) use for the same commands
+SYSTEM_ALIASES = {
+    "minimize": "min", "maximize": "max", "screenshot": "screen", "pause": "play", "playpause": "play",
+    "time": "date", "volume_up": "vol_up", "volume_down": "vol_down", "volumeup": "vol_up",
+    "volumedown": "vol_down", "brightness_up": "bright_up", "brightness_down": "bright_down",
+    "set_volume": "vol_set", "set_brightness": "bright_set", "volume": "vol_set", "brightness": "bright_set",
+}
 
 class SkillSet:
     def __init__(self):
-        pyautogui.FAILSAFE = True 
-        self.gemini_client = None
-        self._init_gemini()
+        # Cheap on purpose: the chat path only needs the local router.
+        # Gemini and the automation libraries load in warm() or on first use.
+        self._gemini = None
+        self._gemini_lock = threading.Lock()
+        # Dispatch table, router prompt and cache rules all come from the @skill declarations
+        self.jobs = JobManager()  # the Brain sets jobs.on_done to hear about finished jobs
+        self.registry = SkillRegistry().collect(self)
+        self.registry.register("chat", None)  # no handler: the Brain answers with the LLM
+        self._system_table = self._system_handlers()
+        # Local fast path; only ambiguous requests reach Gemini
+        self.intent_cache = IntentCache(schema=self.registry.cache_schema())
+        self.apps = AppResolver()  # index of installed apps, loaded in warm()
+        self.router = IntentRouter(remote=self._remote_intent, cache=self.intent_cache, is_app=self.apps.knows)
         
         # Ensure a workspace exists
         self.workspace = os.path.join(os.path.expanduser("~"), "Desktop", "Luna_Workspace")
         if not os.path.exists(self.workspace): os.makedirs(self.workspace)
+        self.notes = NoteStore()
+        self._warm_lock = threading.Lock()
+        self._warmed = False
+
+    def warm(self):
+        """
+        Imports the heavy backends up front (run in a background startup stage).
+        Runs once: server sessions share one SkillSet, and later callers wait for the first.
+        """
+        with self._warm_lock:
+            if not self._warmed:
+                # Independent steps: a headless box without pyautogui still gets its notes, apps and router
+                steps = [("notes import", lambda: self.notes.import_daily_files(self.workspace)),  # Notes_<date>.txt
+                         ("app index", self.apps.refresh),
+                         ("router", self.router.warm),
+                         ("desktop automation", self._warm_desktop)]
+                for name, step in steps:
+                    try: step()
+                    except Exception as e: print(f"[Skills] Warm-up of {name} failed: {e}")
+                self._warmed = True
+        return self.gemini_client
+
+    def _warm_desktop(self):
+        pyautogui.FAILSAFE = True
+        psutil.cpu_percent()
+
+    @property
+    def gemini_client(self):
+        with self._gemini_lock:
+            if self._gemini is None: self._init_gemini()
+            return self._gemini or None
 
     def _init_gemini(self):
         try:
             # Initialize client with the provided key
-            self.gemini_client = genai.Client(api_key=GOOGLE_API_KEY)
+            self._gemini = genai.Client(api_key=GOOGLE_API_KEY)
             print("[Skills] Gemini Researcher Online.")
-        except Exception as e: print(f"[Skills] Gemini Error: {e}")
+        except Exception as e:
+            print(f"[Skills] Gemini Error: {e}")
+            self._gemini = False  # don't retry on every request
 
 # --- 1. INTELLIGENT ROUTER ---
     def analyze_intent(self, user_text):
-        if not self.gemini_client: return {"action": "chat"}
+        return self.router.route(user_text)
+
+    def _remote_intent(self, user_text):
+        """Asks Gemini for the intent. Returns None on failure so it is not cached."""
+        if not self.gemini_client: return None
         
         prompt = (
             "You are a computer automation agent. You map user requests to JSON commands.\n"
             "Respond ONLY with valid JSON. Do not write explanations.\n\n"
             "Schema:\n"
-            "1. REPORT: {\"action\": \"report\", \"target\": \"topic\"}\n"
-            "2. NOTE: {\"action\": \"note\", \"target\": \"content\"}\n"
-            "3. BROWSE: {\"action\": \"browse\", \"target\": \"url\"}\n"
-            "4. OPEN APP: {\"action\": \"open\", \"target\": \"app_name\"}\n"
-            "5. CLOSE APP: {\"action\": \"kill\", \"target\": \"process_name\"}\n"
-            "6. FOLDER: {\"action\": \"folder\", \"target\": \"folder_name\"}\n"
-            "7. SYSTEM: {\"action\": \"system\", \"target\": \"command\", \"value\": number_or_null}\n"
-            "   (commands: vol_set, bright_set, mute, min, max, lock, screen, shutdown, date, ip)\n"
-            "8. CHAT: {\"action\": \"chat\"}\n\n"
+            f"{self.registry.router_schema()}\n\n"
             f"User Request: {user_text}"
         )
         try:
@@ -86,21 +140,106 @@ class SkillSet:
             print(f"[Router Error] {e}")
             # Ensure we see the error in the terminal
             print(f"Raw Gemini Response: {response.text if 'response' in locals() else 'None'}")
-            return {"action": "chat"}
+            return None
     # --- 2. EXECUTION HANDLER ---
-    def execute_intent(self, intent):
-        action = intent.get('action')
-        target = intent.get('target')
-        value = intent.get('value')
-
-        if action == "report": return self.create_report(target)
-        elif action == "note": return self.take_note(target)
-        elif action == "browse": webbrowser.open(target); return f"Opened {target}"
-        elif action == "open": self._open_app(target); return f"Opening {target}"
-        elif action == "kill": return self._kill_process(target)
-        elif action == "folder": return self._create_folder(target)
-        elif action == "system": return self._handle_system(target, value)
-        return None
+    def execute_intent(self, intent, on_done=None):
+        """
+        Runs the skill for intent (None for chat). Slow skills return a short
+        "still running" note and deliver their result to on_done(intent, result).
+        """
+        return self.registry.dispatch(intent, on_done)
+
+    # --- SKILLS (each @skill is one router action; args map intent fields to parameters) ---
+    @skill("report", args={"target": "topic"})
+    def create_report(self, topic):
+        """Starts a background research job; the report streams into the workspace."""
+        if not self.gemini_client: return "API Key missing."
+        job = self.jobs.submit("report", topic, self._write_report)
+        if job is None: return "Too many jobs running, try again later."
+        return f"Started report job #{job['id']} on '{topic}'. The report is being written in the background."
+
+    def _write_report(self, job, cancel):
+        topic = job['target']
+        print(f"[Skill] Researching: {topic}")
+        filename = f"Report_{topic.replace(' ', '_')[:20]}.md"
+        filepath = os.path.join(self.workspace, filename)
+        job['path'] = filepath
+        stream = self.gemini_client.models.generate_content_stream(
+            model='gemini-2.5-flash',
+            contents=f"Write a detailed report on: {topic}. Use Markdown.",
+            config=types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())])
+        )
+        # Partial text is flushed as it arrives, so the file fills while Luna keeps talking
+        with open(filepath, "w", encoding="utf-8") as f:
+            for chunk in stream:
+                if cancel.cancelled:
+                    f.write("\n\n*(Report cancelled.)*\n")
+                    return f"Report cancelled, partial text in {filename}"
+                if chunk.text:
+                    f.write(chunk.text)
+                    f.flush()
+                    job['progress'] += len(chunk.text)
+        if hasattr(os, 'startfile'): os.startfile(filepath)
+        return f"Report saved: {filename}"
+
+    @skill("search", args={"target": "query"})
+    def _search(self, query):
+        if not self.gemini_client: return "No Internet."
+        job = self.jobs.submit("search", query, lambda job, cancel: self.ask_gemini_context(job['target']))
+        if job is None: return "Too many jobs running, try again later."
+        return f"Started search job #{job['id']} for '{query}'."
+
+    @skill("job", args={"target": "command", "value": "job_id_or_null"}, label="BACKGROUND JOBS",
+           commands=("cancel", "list"), cacheable=False)  # job ids go stale as soon as the job ends
+    def _job(self, command, job_id):
+        if str(command).lower() == "cancel":
+            job = self.jobs.get(job_id) if job_id else self.jobs.latest_active()
+            if job is None: return "No running job to cancel."
+            return f"Cancelled job #{job['id']}." if self.jobs.cancel(job['id']) else f"Job #{job['id']} already finished."
+        jobs = self.jobs.list(active_only=True)
+        if not jobs: return "No background jobs running."
+        return "; ".join(f"#{j['id']} {j['kind']} '{j['target']}' {j['state']}" for j in jobs)
+
+    @skill("note", args={"target": "content"}, cacheable=False)  # the note text is the payload, never reused
+    def take_note(self, text):
+        if not text or not str(text).strip(): return "Nothing to note."
+        self.notes.add(str(text))  # committed in the background; #tags become searchable
+        return "Note saved."
+
+    @skill("recall", args={"target": "query", "value": "time_range_or_null"}, label="SEARCH NOTES")
+    def _recall(self, query, when):
+        """Answers "what did I note about X last week" from the note index."""
+        query, since, until = split_when(str(query or ""))
+        explicit = parse_when(when)
+        if explicit[0] is not None: since, until = explicit
+        found = self.notes.search(query, since, until)
+        if not found: return "No matching notes found."
+        return "Notes found: " + "; ".join(
+            f"[{datetime.datetime.fromtimestamp(n['ts']).strftime('%Y-%m-%d %H:%M')}] {n['text']}" for n in found)
+
+    @skill("browse", args={"target": "url"})
+    def _browse(self, url):
+        webbrowser.open(url)
+        return f"Opened {url}"
+
+    @skill("open", args={"target": "app_name"}, label="OPEN APP")
+    def _open(self, app):
+        return f"Opening {self._open_app(app)}"
+
+    @skill("kill", args={"target": "process_name"}, label="CLOSE APP")
+    def _kill(self, process_name):
+        return self._kill_process(process_name)
+
+    @skill("folder", args={"target": "folder_name"})
+    def _folder(self, name):
+        return self._create_folder(name)
+
+    # Info lookups return fresh data every time, so they always re-run the router
+    @skill("system", args={"target": "command", "value": "number_or_null"},
+           commands=SYSTEM_COMMANDS,
+           volatile=("date", "ip"))
+    def _system(self, cmd, value):
+        return self._handle_system(cmd, value)
 
     # --- 3. MANUAL ACTIONS (For Brain.py tags) ---
     def execute_actions(self, actions):
@@ -117,79 +256,59 @@ class SkillSet:
                 elif c == "open": self._open_app(val)
                 elif c == "browse": webbrowser.open(val)
 
-    # --- SKILL: RESEARCH & NOTES ---
-    def create_report(self, topic):
-        if not self.gemini_client: return "API Key missing."
-        print(f"[Skill] Researching: {topic}")
-        try:
-            # FIXED: Changed model to gemini-2.5-flash
-            response = self.gemini_client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=f"Write a detailed report on: {topic}. Use Markdown.",
-                config=types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())])
-            )
-            filename = f"Report_{topic.replace(' ', '_')[:20]}.md"
-            filepath = os.path.join(self.workspace, filename)
-            with open(filepath, "w", encoding="utf-8") as f: f.write(response.text)
-            os.startfile(filepath)
-            return f"Report saved: {filename}"
-        except Exception as e: return f"Research failed: {e}"
-
-    def take_note(self, text):
-        try:
-            date_str = datetime.datetime.now().strftime("%Y-%m-%d")
-            filepath = os.path.join(self.workspace, f"Notes_{date_str}.txt")
-            with open(filepath, "a", encoding="utf-8") as f:
-                f.write(f"[{datetime.datetime.now().strftime('%H:%M')}] {text}\n")
-            return "Note saved."
-        except: return "Failed to save note."
-
     # --- SKILL: SYSTEM CONTROL ---
     def _handle_system(self, cmd, value):
-        cmd = cmd.lower()
-        # Volume / Brightness
-        if "vol" in cmd and "set" in cmd: self._set_volume(value); return f"Volume {value}%"
-        if "bright" in cmd and "set" in cmd and sbc: sbc.set_brightness(value); return f"Brightness {value}%"
-        
-        # Simple Toggles
-        if "mute" in cmd: pyautogui.press('volumemute')
-        elif "vol" in cmd and "up" in cmd: pyautogui.press('volumeup')
-        elif "vol" in cmd and "down" in cmd: pyautogui.press('volumedown')
-        elif "bright" in cmd and "up" in cmd and sbc: sbc.set_brightness('+10')
-        elif "bright" in cmd and "down" in cmd and sbc: sbc.set_brightness('-10')
-        
-        # Window / Power
-        elif "min" in cmd: pyautogui.hotkey('win', 'd')
-        elif "max" in cmd: pyautogui.hotkey('win', 'up')
-        elif "close" in cmd: pyautogui.hotkey('alt', 'f4')
-        elif "lock" in cmd: pyautogui.hotkey('win', 'l')
-        elif "screen" in cmd: 
+        cmd = str(cmd or "").strip().lower().replace(" ", "_")
+        cmd = SYSTEM_ALIASES.get(cmd, cmd)
+        handler = self._system_table.get(cmd)
+        if handler is None: return f"Unknown system command: {cmd}"
+        return handler(value) or "Command executed."
+
+    def _system_handlers(self):
+        def brightness(level):
+            if not sbc: return "Brightness control unavailable."
+            sbc.set_brightness(level)
+        def screenshot(_):
             pyautogui.screenshot(os.path.join(self.workspace, "screenshot.png"))
             return "Screenshot saved to workspace."
-        elif "shutdown" in cmd: os.system("shutdown /s /t 10"); return "Shutting down in 10s!"
-        
-        # Media
-        elif "play" in cmd or "pause" in cmd: pyautogui.press('playpause')
-        elif "next" in cmd: pyautogui.press('nexttrack')
-        
-        # Info
-        elif "date" in cmd or "time" in cmd: return datetime.datetime.now().strftime("%I:%M %p, %A, %d %B %Y")
-        elif "ip" in cmd: return self._get_ip()
-        
-        return "Command executed."
+        def shutdown(_):
+            os.system("shutdown /s /t 10")
+            return "Shutting down in 10s!"
+        return {
+            # Volume / Brightness
+            "vol_set": lambda v: self._set_volume(v),
+            "bright_set": lambda v: brightness(v) or f"Brightness {v}%",
+            "mute": lambda _: pyautogui.press('volumemute'),
+            "vol_up": lambda _: pyautogui.press('volumeup'),
+            "vol_down": lambda _: pyautogui.press('volumedown'),
+            "bright_up": lambda _: brightness('+10'),
+            "bright_down": lambda _: brightness('-10'),
+            # Window / Power
+            "min": lambda _: pyautogui.hotkey('win', 'd'),
+            "max": lambda _: pyautogui.hotkey('win', 'up'),
+            "close": lambda _: pyautogui.hotkey('alt', 'f4'),
+            "lock": lambda _: pyautogui.hotkey('win', 'l'),
+            "screen": screenshot,
+            "shutdown": shutdown,
+            # Media
+            "play": lambda _: pyautogui.press('playpause'),
+            "next": lambda _: pyautogui.press('nexttrack'),
+            # Info
+            "date": lambda _: datetime.datetime.now().strftime("%I:%M %p, %A, %d %B %Y"),
+            "ip": lambda _: self._get_ip(),
+        }
 
     # --- SKILL: APP & FILES ---
     def _open_app(self, app):
-        maps = {
-            "chrome": "chrome", "google": "chrome", "spotify": "spotify", 
-            "notepad": "notepad", "calc": "calc", "settings": "ms-settings:", 
-            "explorer": "explorer", "vscode": "code", "code": "code", 
-            "discord": "discord", "terminal": "cmd"
-        }
-        target = maps.get(app.lower(), app)
+        """Launches the installed app directly; returns the name it was opened as."""
+        launched = self.apps.open(app)
+        if launched: return launched
+        # Fallback: type it into the Start menu (slow, and needs the focus to stay put)
+        target = ALIASES.get(app.lower(), app)
         pyautogui.press('win'); time.sleep(0.1)
         pyautogui.write(target); time.sleep(0.5)
         pyautogui.press('enter')
+        return app
 
     def _kill_process(self, process_name):
         try:
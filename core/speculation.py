@@ -0,0 +1,80 @@
+import queue
+import statistics
+import threading
+import time
+
+_END = object()
+
+class BackgroundStream:
+    """
+    Consumes an LLM stream on its own thread and buffers the chunks,
+    so generation can start before we know whether we want the result.
+    """
+    def __init__(self, factory, messages=None):
+        self.messages = messages  # the prompt, kept for context accounting
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self.final = {}  # Ollama's timing fields from the last ("done") chunk
+        self.started = time.perf_counter()
+        self.first_token = None  # when the model produced its first content (perf_counter)
+        self.ended = None
+        threading.Thread(target=self._run, args=(factory,), daemon=True).start()
+
+    def _run(self, factory):
+        stream = None
+        try:
+            stream = factory()
+            for chunk in stream:
+                if self._cancelled.is_set(): break
+                if self.first_token is None and chunk['message']['content']: self.first_token = time.perf_counter()
+                if chunk.get('done'):
+                    self.final = {k: chunk.get(k) for k in ('prompt_eval_count', 'prompt_eval_duration', 'eval_count', 'eval_duration', 'load_duration')}
+                self._queue.put(chunk['message']['content'])
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            self.ended = time.perf_counter()
+            # Closing the generator drops the HTTP response so Ollama stops generating
+            if self._cancelled.is_set() and hasattr(stream, 'close'):
+                try: stream.close()
+                except Exception: pass
+            self._queue.put(_END)
+
+    def cancel(self):
+        self._cancelled.set()
+        self._queue.put(_END)  # wake a consumer that is waiting for the next chunk
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _END: return
+            if isinstance(item, Exception): raise item
+            yield item
+
+class SpeculationStats:
+    """Wasted-speculation rate and time-to-first-token with and without speculation."""
+    def __init__(self):
+        self.speculated = 0
+        self.wasted = 0
+        self._ttft = {True: [], False: []}
+        self._lock = threading.Lock()
+
+    def record(self, speculative, ttft, wasted=False):
+        with self._lock:
+            if speculative:
+                self.speculated += 1
+                if wasted: self.wasted += 1
+            samples = self._ttft[speculative]
+            samples.append(ttft)
+            if len(samples) > 500: del samples[0]
+
+    def report(self):
+        with self._lock:
+            def median(xs): return round(statistics.median(xs), 3) if xs else None
+            return {
+                "speculated_turns": self.speculated,
+                "wasted": self.wasted,
+                "wasted_rate": self.wasted / self.speculated if self.speculated else 0.0,
+                "median_ttft_speculative_s": median(self._ttft[True]),
+                "median_ttft_sequential_s": median(self._ttft[False]),
+            }
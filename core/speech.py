@@ -0,0 +1,138 @@
+import re
+import queue
+import threading
+import time
+from core.tracing import TRACER
+
+# Sentence boundary: end punctuation followed by whitespace, or a line break
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+TAG_PATTERN = re.compile(r'\[.*?\]')
+MIN_SENTENCE_CHARS = 12
+
+def clean_for_speech(text):
+    """Removes inline command tags so they are never read aloud."""
+    return ' '.join(TAG_PATTERN.sub('', text).split())
+
+class SentenceSplitter:
+    """Accumulates streamed chunks and hands back complete sentences."""
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        sentences = []
+        start = 0
+        for match in SENTENCE_BREAK.finditer(self.buffer):
+            end = match.end()
+            candidate = self.buffer[start:end]
+            # Never cut inside an unfinished [TAG:...] and skip tiny fragments ("Hi!")
+            if candidate.count('[') > candidate.count(']'): continue
+            if len(candidate.strip()) < self.min_chars: continue
+            sentences.append(candidate.strip())
+            start = end
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+def split_sentences(text):
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+class SpeechPipeline:
+    """
+    Two-stage speech queue: one thread synthesizes sentences while the voice's
+    playback engine plays the previous ones, so audio starts after the first
+    sentence. Playback completion callbacks drive on_start / on_idle.
+    """
+    def __init__(self, voice, on_start=None, on_idle=None):
+        self.voice = voice
+        self.on_start = on_start
+        self.on_idle = on_idle
+        self._text_queue = queue.Queue()
+        self._lock = threading.Condition()
+        self._pending = 0
+        self._epoch = 0
+        self._speaking = False
+        self._last_end = 0.0
+        threading.Thread(target=self._synth_loop, daemon=True).start()
+
+    def say(self, text):
+        text = clean_for_speech(text)
+        if len(text) == 0: return
+        with self._lock:
+            self._pending += 1
+            epoch = self._epoch
+        self._text_queue.put((epoch, TRACER.turn, text))
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued so far has been played."""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self):
+        """Drops queued sentences and cuts the current one short."""
+        with self._lock:
+            self._epoch += 1
+            self.voice.stop()
+
+    def close(self):
+        """Stops speaking and ends the synthesis and audio threads."""
+        self.stop()
+        self._text_queue.put(None)
+        self.voice.close()
+
+    def _is_stale(self, epoch):
+        with self._lock: return epoch != self._epoch
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+            idle = self._pending == 0
+            was_speaking = self._speaking
+            if idle: self._speaking = False
+            self._lock.notify_all()
+        if idle and was_speaking and self.on_idle: self.on_idle()
+
+    def _synth_loop(self):
+        while True:
+            item = self._text_queue.get()
+            if item is None: return
+            epoch, turn, text = item
+            audio = None
+            if not self._is_stale(epoch):
+                try:
+                    with TRACER.span("tts.synthesize", turn, chars=len(text)):
+                        audio = self.voice.synthesize(text)
+                except Exception as e: print(f"[Speech] Synthesis failed: {e}")
+            with self._lock:
+                # Checked under the lock so stop() cannot slip in between check and enqueue
+                play = audio is not None and epoch == self._epoch
+                starting = play and not self._speaking
+                if play:
+                    self._speaking = True
+                    if starting and self.on_start: self.on_start()
+                    # Returns at once: the engine plays it right after the previous sentence
+                    self.voice.enqueue(audio, self._on_played(turn, time.perf_counter()))
+            if not play: self._done()
+
+    def _on_played(self, turn, queued):
+        def on_done(finished):
+            # Playback is sequential: this one started when it was queued or when the last one ended
+            end = time.perf_counter()
+            with self._lock:
+                start, self._last_end = max(queued, self._last_end), end
+            TRACER.record("audio.play", start, end, turn, finished=finished)
+            self._done()
+        return on_done
+
+class MutedSpeech:
+    """Stand-in for sessions that do not speak (server clients): same interface, no audio."""
+    def say(self, text): pass
+    def wait(self, timeout=None): return True
+    def stop(self): pass
+    def close(self): pass
@@ -0,0 +1,69 @@
+import threading
+import time
+
+class StagedStartup:
+    """
+    Loads subsystems in parallel background threads and reports each one's
+    state ("loading" / "ready" / "failed") so the UI can show readiness.
+    """
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def start(self, name, fn):
+        stage = {"state": "loading", "result": None, "error": None, "ms": None,
+                 "done": threading.Event(), "callbacks": []}
+        with self._lock: self._stages[name] = stage
+        self._notify(name, "loading")
+        threading.Thread(target=self._run, args=(name, stage, fn), daemon=True).start()
+
+    def _run(self, name, stage, fn):
+        start = time.perf_counter()
+        try:
+            stage["result"] = fn()
+            state = "ready"
+        except Exception as e:
+            stage["error"] = e
+            state = "failed"
+            print(f"[Startup] {name} failed: {e}")
+        with self._lock:
+            stage["state"] = state
+            stage["ms"] = round((time.perf_counter() - start) * 1000)
+            callbacks, stage["callbacks"] = stage["callbacks"], []
+            stage["done"].set()
+        print(f"[Startup] {name} {state} in {stage['ms']} ms")
+        self._notify(name, state)
+        if state == "ready":
+            for callback in callbacks: callback(stage["result"])
+
+    def get(self, name, timeout=None):
+        """Waits for a stage and returns its result (None if it failed, timed out or never started)."""
+        stage = self._stages.get(name)
+        if stage is None: return None
+        stage["done"].wait(timeout)
+        return stage["result"]
+
+    def when_ready(self, name, callback):
+        """Runs callback(result) now if the stage is ready, or as soon as it is (never if not started)."""
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None: return
+            if not stage["done"].is_set():
+                stage["callbacks"].append(callback)
+                return
+        if stage["state"] == "ready": callback(stage["result"])
+
+    def is_ready(self, name):
+        stage = self._stages.get(name)
+        return stage is not None and stage["state"] == "ready"
+
+    def status(self):
+        with self._lock:
+            return {name: {"state": s["state"], "ms": s["ms"]} for name, s in self._stages.items()}
+
+    def _notify(self, name, state):
+        if self.on_change:
+            try: self.on_change(name, state)
+            except Exception as e: print(f"[Startup] {e}")
@@ -0,0 +1,121 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+STORE_FILE = "core/conversation.db"
+LEGACY_MEMORY_FILE = "core/memory.json"
+FLUSH_INTERVAL = 0.5   # seconds of write-behind batching
+FLUSH_BATCH = 64       # ...or this many queued messages, whichever comes first
+CHECKPOINT_EVERY = 200 # flushes between WAL checkpoints (keeps the -wal file small)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    ts REAL NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session, id);
+"""
+
+class ConversationStore:
+    """
+    Full conversation history in SQLite (WAL mode). Writes are queued and
+    committed in batches by a background thread; SQLite's journal makes
+    every batch atomic, so a crash loses at most the last unflushed batch.
+    """
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.session = time.strftime("%Y%m%d-%H%M%S")
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        self._import_legacy()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- WRITES (hot path only enqueues) ---
+    def append(self, message):
+        self._queue.put((self.session, time.time(), message['role'], message['content']))
+
+    def close(self):
+        """Flushes pending writes; call before exiting."""
+        self._closed.set()
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        conn = self._connect()
+        flushes = 0
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH and batch[-1] is not None:
+                try: batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty: break
+            rows = [row for row in batch if row is not None]
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO messages(session, ts, role, content) VALUES (?, ?, ?, ?)", rows)
+                flushes += 1
+                if flushes % CHECKPOINT_EVERY == 0: conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                print(f"[Store] Write failed, {len(rows)} messages lost: {e}")
+            if batch[-1] is None:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+                return
+
+    # --- READS ---
+    def _query(self, sql, args=()):
+        with self._read_lock:
+            return self._reader.execute(sql, args).fetchall()
+
+    def recent(self, limit=40):
+        """The newest messages across sessions, oldest first (the working window)."""
+        rows = self._query("SELECT role, content FROM messages ORDER BY id DESC LIMIT ?", (limit,))
+        return [{'role': r, 'content': c} for r, c in reversed(rows)]
+
+    def page(self, before_id=None, limit=50, session=None):
+        """Older messages, newest first, for lazily scrolling back. Pass the last id as before_id."""
+        sql = "SELECT id, session, ts, role, content FROM messages WHERE id < ?"
+        args = [before_id if before_id is not None else 2 ** 63 - 1]
+        if session:
+            sql += " AND session = ?"
+            args.append(session)
+        rows = self._query(sql + " ORDER BY id DESC LIMIT ?", args + [limit])
+        return [{'id': i, 'session': s, 'ts': t, 'role': r, 'content': c} for i, s, t, r, c in rows]
+
+    def sessions(self, limit=20, offset=0):
+        rows = self._query(
+            "SELECT session, MIN(ts), MAX(ts), COUNT(*) FROM messages GROUP BY session "
+            "ORDER BY MAX(id) DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [{'session': s, 'start': a, 'end': b, 'messages': n} for s, a, b, n in rows]
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM messages")[0][0]
+
+    # --- MIGRATION ---
+    def _import_legacy(self):
+        """One-time import of the old whole-file memory.json."""
+        if not os.path.exists(LEGACY_MEMORY_FILE) or self.count(): return
+        try:
+            with open(LEGACY_MEMORY_FILE, 'r') as f: history = json.load(f)
+            rows = [("legacy", 0.0, m['role'], m['content']) for m in history[1:]]
+            with self._read_lock, self._reader:
+                self._reader.executemany("INSERT INTO messages(session, ts, role, content) VALUES (?, ?, ?, ?)", rows)
+            print(f"[Store] Imported {len(rows)} messages from {LEGACY_MEMORY_FILE}")
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            print(f"[Store] Legacy import skipped: {e}")
@@ -0,0 +1,71 @@
+SIMPLE_TAGS = {
+    "MINIMIZE": "minimize", "MAXIMIZE": "maximize", "CLOSE": "close",
+    "LOCK": "lock", "SCREENSHOT": "screenshot",
+    "VOL_UP": "vol_up", "VOL_DOWN": "vol_down", "MUTE": "mute",
+    "BRIGHT_UP": "bright_up", "BRIGHT_DOWN": "bright_down",
+    "PLAY": "play", "NEXT": "next",
+}
+ARG_TAGS = {"TYPE": "type", "OPEN": "open", "BROWSE": "browse"}  # [NAME:argument]
+MAX_TAG_CHARS = 400  # an unclosed '[' longer than this is just text
+
+class TagParser:
+    """
+    Streaming tokenizer for the inline command tags in replies ([VOL_UP], [OPEN:spotify]).
+    feed() takes raw chunks and returns (text, commands): the text with command tags
+    removed, and every command whose closing bracket has arrived, in order.
+    Brackets that are not commands ("[laughs]") are passed through as text.
+    """
+    def __init__(self, max_tag=MAX_TAG_CHARS):
+        self.max_tag = max_tag
+        self._tag = None  # text after an open '[' while inside a tag, else None
+
+    def feed(self, chunk):
+        out, commands = [], []
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._tag is None:
+                # TEXT: copy up to the next '['
+                j = chunk.find('[', i)
+                if j < 0:
+                    out.append(chunk[i:])
+                    break
+                out.append(chunk[i:j])
+                self._tag, i = "", j + 1
+                continue
+            # TAG: collect up to ']' (a new '[' means the old one was just text)
+            close, reopen = chunk.find(']', i), chunk.find('[', i)
+            if reopen >= 0 and (close < 0 or reopen < close):
+                out.append('[' + self._tag + chunk[i:reopen])
+                self._tag, i = "", reopen + 1
+                continue
+            if close < 0:
+                self._tag += chunk[i:]
+                if len(self._tag) > self.max_tag:
+                    out.append('[' + self._tag)
+                    self._tag = None
+                break
+            body, self._tag, i = self._tag + chunk[i:close], None, close + 1
+            command = self._resolve(body)
+            if command is None: out.append('[' + body + ']')
+            else: commands.append(command)
+        return "".join(out), commands
+
+    def flush(self):
+        """Returns an unfinished tag as plain text (end of stream)."""
+        rest = "" if self._tag is None else '[' + self._tag
+        self._tag = None
+        return rest
+
+    def _resolve(self, body):
+        name, sep, arg = body.partition(':')
+        name = name.strip().upper()
+        if not sep: return SIMPLE_TAGS.get(name)
+        cmd = ARG_TAGS.get(name)
+        arg = arg.strip()
+        return {"cmd": cmd, "content": arg} if cmd and arg else None
+
+def parse_tags(text):
+    """Whole-string version of TagParser."""
+    parser = TagParser()
+    clean, commands = parser.feed(text)
+    return clean + parser.flush(), commands
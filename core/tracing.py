@@ -0,0 +1,111 @@
+import itertools
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+TRACE_CAPACITY = 4096  # spans kept in memory; the oldest fall off
+TRACE_DIR = "core/traces"
+
+class _Span:
+    __slots__ = ("tracer", "name", "turn", "attrs", "start")
+
+    def __init__(self, tracer, name, turn, attrs):
+        self.tracer, self.name, self.turn, self.attrs = tracer, name, turn, attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.turn, **self.attrs)
+
+class _NoSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+class Tracer:
+    """
+    Per-stage timing spans in a fixed-size ring buffer. A span is one tuple
+    (name, turn, start, end, thread, attrs); recording is a deque append, so
+    it is cheap enough to leave on. Turns run one at a time on the scheduler,
+    so spans opened without an explicit turn belong to the current one.
+    """
+    def __init__(self, capacity=TRACE_CAPACITY, enabled=True):
+        self.enabled = enabled
+        self.turn = 0
+        self._turns = itertools.count(1)
+        self._spans = deque(maxlen=capacity)
+        self._origin = time.perf_counter()
+
+    def new_turn(self):
+        self.turn = next(self._turns)
+        return self.turn
+
+    def span(self, name, turn=None, **attrs):
+        """`with TRACER.span("route"):` times the block."""
+        if not self.enabled: return _NoSpan()
+        return _Span(self, name, self.turn if turn is None else turn, attrs)
+
+    def record(self, name, start, end, turn=None, **attrs):
+        """Adds a span measured elsewhere (perf_counter seconds)."""
+        if not self.enabled or start is None or end is None: return
+        self._spans.append((name, self.turn if turn is None else turn, start, end,
+                            threading.current_thread().name, attrs))
+
+    def spans(self, turn=None):
+        spans = list(self._spans)
+        return spans if turn is None else [s for s in spans if s[1] == turn]
+
+    # --- SUMMARY ---
+    def summary(self):
+        """Per-stage p50/p95 in ms plus the latest turn's breakdown (for the debug overlay)."""
+        spans = self.spans()
+        stages = {}
+        for name, _, start, end, _, _ in spans: stages.setdefault(name, []).append((end - start) * 1000)
+        def p(xs, q): return round(sorted(xs)[min(len(xs) - 1, int(q * len(xs)))], 1)
+        last = max((s[1] for s in spans), default=None)
+        mine = sorted((s for s in spans if s[1] == last), key=lambda s: s[2])
+        t0 = mine[0][2] if mine else 0
+        return {
+            "turn": last,
+            "stages": {name: {"count": len(xs), "p50_ms": p(xs, 0.5), "p95_ms": p(xs, 0.95),
+                              "mean_ms": round(statistics.fmean(xs), 1)} for name, xs in stages.items()},
+            "last_turn": [{"name": name, "at_ms": round((start - t0) * 1000, 1), "ms": round((end - start) * 1000, 1)}
+                          for name, _, start, end, _, _ in mine],
+        }
+
+    # --- EXPORT ---
+    def _as_dict(self, span):
+        name, turn, start, end, thread, attrs = span
+        return {"name": name, "turn": turn, "start_ms": round((start - self._origin) * 1000, 3),
+                "ms": round((end - start) * 1000, 3), "thread": thread, **attrs}
+
+    def export_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans(): f.write(json.dumps(self._as_dict(span), default=str) + "\n")
+        return path
+
+    def export_chrome(self, path):
+        """Chrome trace format: open in chrome://tracing or ui.perfetto.dev."""
+        threads = {}
+        events = []
+        for name, turn, start, end, thread, attrs in self.spans():
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append({"name": name, "cat": name.split(".")[0], "ph": "X", "pid": 1, "tid": tid,
+                           "ts": round((start - self._origin) * 1e6), "dur": round((end - start) * 1e6),
+                           "args": {"turn": turn, **{k: str(v) for k, v in attrs.items()}}})
+        events += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}}
+                   for thread, tid in threads.items()]
+        with open(path, "w", encoding="utf-8") as f: json.dump({"traceEvents": events}, f)
+        return path
+
+    def export(self, fmt="chrome", directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if fmt == "jsonl": return self.export_jsonl(os.path.join(directory, f"trace-{stamp}.jsonl"))
+        return self.export_chrome(os.path.join(directory, f"trace-{stamp}.json"))
+
+TRACER = Tracer()
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import math
+import struct
+import threading
+import wave
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 8 * 1024 * 1024  # ~8 MB of mp3 is a few hundred short phrases
+
+def normalize_phrase(text):
+    return ' '.join(text.lower().split())
+
+class PhraseCache:
+    """Size-bounded LRU of synthesized audio keyed by (voice_id, normalized text)."""
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, voice_id, text):
+        key = (voice_id, normalize_phrase(text))
+        with self._lock:
+            audio = self._items.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, voice_id, text, audio):
+        if len(audio) > self.max_bytes: return
+        key = (voice_id, normalize_phrase(text))
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None: self.size -= len(old)
+            self._items[key] = audio
+            self.size += len(audio)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._items), "bytes": self.size
+            }
+
+class TTSBackend:
+    """Base synthesizer. Subclasses return the whole utterance as bytes."""
+    format = "mp3"
+
+    def synthesize(self, text, voice_id):
+        raise NotImplementedError
+
+    def close(self): pass
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge TTS on one long-lived event loop, streamed into memory."""
+    format = "mp3"
+
+    def __init__(self):
+        import edge_tts
+        self._edge_tts = edge_tts
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def synthesize(self, text, voice_id, timeout=30):
+        future = asyncio.run_coroutine_threadsafe(self._stream(text, voice_id), self._loop)
+        return future.result(timeout)
+
+    async def _stream(self, text, voice_id):
+        buf = io.BytesIO()
+        communicate = self._edge_tts.Communicate(text, voice_id)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio": buf.write(chunk["data"])
+        return buf.getvalue()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+class OfflineTTSBackend(TTSBackend):
+    """
+    Local stand-in: renders a soft tone as long as the sentence would take to say.
+    Needs no network, so it is handy offline and for benchmarks.
+    """
+    format = "wav"
+
+    def __init__(self, sample_rate=16000, chars_per_second=15):
+        self.sample_rate = sample_rate
+        self.chars_per_second = chars_per_second
+
+    def synthesize(self, text, voice_id):
+        seconds = max(0.2, len(text) / self.chars_per_second)
+        frames = int(self.sample_rate * seconds)
+        samples = (int(800 * math.sin(2 * math.pi * 220 * i / self.sample_rate)) for i in range(frames))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(b"".join(struct.pack("<h", s) for s in samples))
+        return buf.getvalue()
+
+class CachedTTS:
+    """Wraps a backend with the phrase cache so repeated lines skip the network."""
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else PhraseCache()
+
+    @property
+    def format(self): return self.backend.format
+
+    def synthesize(self, text, voice_id):
+        audio = self.cache.get(voice_id, text)
+        if audio is None:
+            audio = self.backend.synthesize(text, voice_id)
+            if audio: self.cache.put(voice_id, text, audio)
+        return audio
+
+    def stats(self): return self.cache.stats()
+
+def create_backend(name="edge"):
+    """Falls back to the offline stand-in if edge-tts is not installed."""
+    if name == "edge":
+        try: return EdgeTTSBackend()
+        except ImportError: print("[Voice] edge-tts missing, using offline voice.")
+    return OfflineTTSBackend()
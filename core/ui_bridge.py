@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+
+FRAME_INTERVAL = 0.03  # seconds between bridge calls (16-50 ms feels smooth)
+
+class UIBridge:
+    """
+    Coalesces UI updates into at most one delivery per frame. Ops are handed
+    in order to `sink(ops)` (the server's WebSocket fan-out), or with only a
+    window given, to applyBatch() in assets/index.html via evaluate_js.
+    """
+    def __init__(self, window=None, interval=FRAME_INTERVAL, ready=None, sink=None):
+        self.window = window
+        self.sink = sink or (window and (lambda ops: window.evaluate_js(f"applyBatch({json.dumps(ops)})")))
+        self.interval = interval
+        # Ops are held until the page has loaded its JS (pywebviewready)
+        self.ready = ready if ready is not None else threading.Event()
+        if ready is None: self.ready.set()
+        self.calls = 0
+        self._ops = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_flush = 0.0
+        self._closed = False
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    # --- PUBLIC OPS ---
+    def chunk(self, text):
+        if not text: return
+        with self._lock:
+            # Merge with the previous chunk instead of adding a new op
+            if self._ops and self._ops[-1][0] == "chunk": self._ops[-1][1] += text
+            else: self._ops.append(["chunk", text])
+        self._wake.set()
+
+    def status(self, status):
+        with self._lock:
+            # Only the latest of back-to-back status changes is visible anyway
+            if self._ops and self._ops[-1][0] == "status": self._ops[-1][1] = status
+            else: self._ops.append(["status", status])
+        self._wake.set()
+
+    def subsystem(self, name, state):
+        """Startup readiness of one subsystem ('loading' / 'ready' / 'failed')."""
+        self._push(["subsystem", name, state])
+
+    def begin(self, turn=None):
+        """Opens a new streaming reply bubble. `turn` (the turn's CancelToken id) tags begin and complete."""
+        self._push(["begin"] if turn is None else ["begin", turn])
+
+    def message(self, text, kind='ai'):
+        self._push(["message", text, kind])
+
+    def skill(self, action, result):
+        """Outcome of a skill run during the turn."""
+        self._push(["skill", action, result])
+
+    def job(self, job):
+        """A background job (report, search) finished."""
+        self._push(["job", job])
+
+    def complete(self, turn=None):
+        self._push(["complete"] if turn is None else ["complete", turn])
+        self.flush()
+
+    # --- DELIVERY ---
+    def _push(self, op):
+        with self._lock: self._ops.append(op)
+        self._wake.set()
+
+    def close(self):
+        """Delivers what is queued and ends the flush thread."""
+        self._closed = True
+        self.flush()
+        self._wake.set()
+
+    def flush(self):
+        if not self.ready.is_set(): return
+        with self._send_lock:
+            with self._lock:
+                ops, self._ops = self._ops, []
+                self._wake.clear()
+            self._last_flush = time.monotonic()
+            if not ops or not self.sink: return
+            self.calls += 1
+            try: self.sink(ops)
+            except Exception as e: print(f"[UI] Bridge error: {e}")
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            # Ops wait for the page; a bridge closed before any page loaded just stops
+            while not self.ready.wait(1.0):
+                if self._closed: return
+            delay = self._last_flush + self.interval - time.monotonic()
+            if delay > 0: time.sleep(delay)
+            self.flush()
@@ -1,81 +1,90 @@
-import asyncio
-import edge_tts
-import pygame
-import os
-import uuid
-import time
+import threading
+from core.tts import CachedTTS, create_backend
+from core.playback import PlaybackEngine, PygameDriver, DummyDriver
+
+TTS_BACKEND = "edge"  # "edge" (online) or "offline" (local stand-in)
 
 class VoiceEngine:
-    def __init__(self):
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print(f"[Voice Init Error] {e}")
-        
+    def __init__(self, backend=None, driver=None):
         # "en-US-AnaNeural" = Child/Teen American Girl
-        self.voice_id = "en-US-AnaNeural" 
-        self.current_file = None
+        self.voice_id = "en-US-AnaNeural"
+        self._backend = backend
+        self._driver = driver
+        self._tts = None
+        self._player = None
+        self._warm_lock = threading.Lock()
+
+    def warm(self):
+        """Starts the audio driver and the TTS backend; runs on first use if not called earlier."""
+        with self._warm_lock:
+            if self._tts is not None: return self
+            if self._driver is None:
+                try: self._driver = PygameDriver()
+                except Exception as e:
+                    print(f"[Voice Init Error] {e} (playing silently)")
+                    self._driver = DummyDriver()
+            self._player = PlaybackEngine(self._driver)
+            self._tts = CachedTTS(self._backend or create_backend(TTS_BACKEND))
+        return self
+
+    @property
+    def tts(self):
+        return self._tts or self.warm()._tts
+
+    @property
+    def player(self):
+        return self._player or self.warm()._player
 
     def speak(self, text):
         if not text or len(text.strip()) == 0: return
-        
+
         # Debug log to confirm the AI is trying to speak
         print(f"[Voice] Generating audio for: {text[:30]}...")
 
-        # Unique filename to prevent locking errors
-        new_file = f"speech_{uuid.uuid4().hex}.mp3"
         try:
-            # 1. Generate Audio File
-            asyncio.run(self._generate_file(text, new_file))
-            
+            # 1. Generate Audio (in memory)
+            audio = self.synthesize(text)
+
             # 2. Play Audio
-            self._play_audio(new_file)
-            
+            self.play(audio)
+
         except Exception as e:
             print(f"[Voice Error] {e}")
 
-    async def _generate_file(self, text, filename):
+    def synthesize(self, text):
+        """Returns the audio bytes for one sentence (used by SpeechPipeline)."""
         try:
-            communicate = edge_tts.Communicate(text, self.voice_id)
-            await communicate.save(filename)
+            return self.tts.synthesize(text, self.voice_id)
         except Exception as e:
             print(f"[Voice Generation Error] Is internet connected? {e}")
             raise e
 
-    def _play_audio(self, filename):
-        if not os.path.exists(filename): return
+    def enqueue(self, audio, on_done=None):
+        """Queues audio behind whatever is playing and returns at once; on_done(finished) follows."""
+        if not audio:
+            if on_done: on_done(True)
+            return
+        try: self.player.enqueue(audio, on_done)
+        except Exception as e:
+            print(f"[Voice Playback Error] {e}")
+            if on_done: on_done(False)
+
+    def play(self, audio, timeout=60):
+        """Blocking playback of one utterance (with a failsafe timeout)."""
+        done = threading.Event()
+        self.enqueue(audio, lambda finished: done.set())
+        if not done.wait(timeout):
+            print("[Voice] Timeout reached, stopping audio.")
+            self.stop()
 
-        # Stop previous playback if any
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
-        
-        try: pygame.mixer.music.unload()
-        except: pass
+    def stop(self):
+        """Silences the current utterance and drops everything queued."""
+        if self._player: self._player.stop()
 
-        # Clean up the previous file to save space
-        if self.current_file and os.path.exists(self.current_file):
-            try: os.remove(self.current_file)
-            except: pass
+    def close(self):
+        """Ends the playback thread and the TTS backend; the engine is not usable afterwards."""
+        if self._player: self._player.close()
+        if self._tts: self._tts.backend.close()
 
-        try:
-            pygame.mixer.music.load(filename)
-            pygame.mixer.music.play()
-            self.current_file = filename
-            
-            # Block to keep animation sync (with Timeout Failsafe)
-            # This prevents the app from freezing forever if pygame glitches
-            start_time = time.time()
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-                # Force stop if audio hangs for > 60 seconds
-                if time.time() - start_time > 60:
-                    print("[Voice] Timeout reached, stopping audio.")
-                    pygame.mixer.music.stop()
-                    break
-            
-            # Unload immediately to release file lock
-            try: pygame.mixer.music.unload()
-            except: pass
-            
-        except Exception as e:
-            print(f"[Voice Playback Error] {e}")
\ No newline at end of file
+    def cache_stats(self):
+        return self.tts.stats()
@@ -0,0 +1,170 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEBOUNCE_SECONDS = 0.75   # focus bursts shorter than this (alt-tab cycling) are ignored
+DWELL_SECONDS = 8.0       # the user must stay on a window this long before Luna reacts
+RECENT_TITLES = 50        # titles already commented on...
+RECENT_TTL = 30 * 60      # ...are skipped for this long
+POLL_MIN = 0.5            # adaptive polling bounds (seconds)
+POLL_MAX = 5.0
+
+def normalize_title(title):
+    # "(3) Inbox - Gmail" and "(4) Inbox - Gmail" are the same window for our purposes
+    return re.sub(r'^\(\d+\)\s*', '', title or '').strip().lower()
+
+# --- EVENT SOURCES ---
+# A source calls `callback(title)` whenever the focused window may have changed.
+class FakeSource:
+    """Headless source for tests: call emit() to simulate focus changes."""
+    def start(self, callback): self.callback = callback
+    def stop(self): pass
+    def emit(self, title): self.callback(title)
+
+class PollingSource:
+    """
+    Polls a cheap title-only probe. Polls fast right after a change and
+    backs off towards POLL_MAX while the title stays the same.
+    """
+    def __init__(self, probe, min_interval=POLL_MIN, max_interval=POLL_MAX):
+        self.probe = probe
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._stop = threading.Event()
+
+    def start(self, callback):
+        threading.Thread(target=self._loop, args=(callback,), daemon=True).start()
+
+    def stop(self): self._stop.set()
+
+    def _loop(self, callback):
+        last, interval = None, self.min_interval
+        while not self._stop.wait(interval):
+            try: title = self.probe()
+            except Exception: continue
+            if title != last:
+                last, interval = title, self.min_interval
+                callback(title)
+            else:
+                interval = min(self.max_interval, interval * 1.5)
+
+class WinEventHookSource:
+    """Native Windows focus-change hook (EVENT_SYSTEM_FOREGROUND); no polling at all."""
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes, self._wintypes = ctypes, wintypes
+        self._user32 = ctypes.windll.user32
+        self._thread_id = None
+
+    def start(self, callback):
+        threading.Thread(target=self._loop, args=(callback,), daemon=True).start()
+
+    def stop(self):
+        if self._thread_id: self._user32.PostThreadMessageW(self._thread_id, 0x0012, 0, 0)  # WM_QUIT
+
+    def _loop(self, callback):
+        ctypes, wintypes, user32 = self._ctypes, self._wintypes, self._user32
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, obj, child, thread, ms):
+            buf = ctypes.create_unicode_buffer(512)
+            user32.GetWindowTextW(hwnd, buf, 512)
+            callback(buf.value)
+
+        self._proc = WinEventProc(on_event)  # keep a reference or ctypes frees it
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        hook = user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                      0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWinEvent(hook)
+
+def create_source(probe):
+    """Native hook on Windows, adaptive polling of `probe` everywhere else."""
+    if sys.platform == "win32":
+        try: return WinEventHookSource()
+        except Exception as e: print(f"[Watcher] Focus hook unavailable ({e}), polling instead.")
+    return PollingSource(probe)
+
+# --- WATCHER ---
+class WindowWatcher:
+    """
+    Turns raw focus events into "the user has settled on this window" events.
+    A focus change only counts once it has lasted `debounce` seconds, so quick
+    alt-tabbing neither triggers anything nor resets the current window's dwell
+    timer. The settled window must then hold focus for `dwell` seconds, and
+    titles already commented on recently are skipped.
+    """
+    def __init__(self, source, on_dwell, debounce=DEBOUNCE_SECONDS, dwell=DWELL_SECONDS,
+                 recent=RECENT_TITLES, recent_ttl=RECENT_TTL, clock=time.monotonic):
+        self.source = source
+        self.on_dwell = on_dwell
+        self.debounce = debounce
+        self.dwell = dwell
+        self.recent_size = recent
+        self.recent_ttl = recent_ttl
+        self.clock = clock
+        self.counts = {"events": 0, "debounced": 0, "duplicates": 0, "fired": 0}
+        self._recent = OrderedDict()
+        self._settled = None   # (title, since)
+        self._pending = None   # (title, at): a change that has not outlived the debounce yet
+        self._fired = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self, tick=0.25):
+        self.source.start(self.on_focus)
+        threading.Thread(target=self._tick_loop, args=(tick,), daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.source.stop()
+
+    def on_focus(self, title):
+        now = self.clock()
+        with self._lock:
+            self.counts["events"] += 1
+            self._promote(now)
+            if self._pending: self.counts["debounced"] += 1
+            settled = self._settled[0] if self._settled else None
+            # Back on the settled window: the detour never happened
+            self._pending = None if normalize_title(title) == normalize_title(settled) else (title, now)
+
+    def _promote(self, now):
+        if self._pending and now - self._pending[1] >= self.debounce:
+            self._settled, self._pending, self._fired = self._pending, None, False
+
+    def poll(self):
+        """Fires on_dwell if the current window has settled. Called by the tick thread (or tests)."""
+        now = self.clock()
+        with self._lock:
+            self._promote(now)
+            if not self._settled or self._pending or self._fired: return None
+            title, since = self._settled
+            if not title or now - since < self.dwell: return None
+            self._fired = True
+            key = normalize_title(title)
+            seen = self._recent.get(key)
+            if seen is not None and now - seen < self.recent_ttl:
+                self.counts["duplicates"] += 1
+                return None
+            self._recent[key] = now
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.recent_size: self._recent.popitem(last=False)
+            self.counts["fired"] += 1
+        self.on_dwell(title)
+        return title
+
+    def _tick_loop(self, tick):
+        while not self._stop.wait(tick):
+            try: self.poll()
+            except Exception as e: print(f"[Watcher] {e}")
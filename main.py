@@ -1,62 +1,61 @@
+import argparse
 import os
-import threading
-import time
 import webview
-from core.brain import Brain
+from core.server import LunaServer, HOST, PORT
 
 WINDOW_WIDTH = 380
 WINDOW_HEIGHT = 650
 
-# Global brain reference to avoid circular dependency
+# Global references to avoid circular dependency
+server = None
 global_brain = None
 
 class Api:
-    """Methods callable from JavaScript"""
-    
-    def user_message(self, text):
-        """Called when user types in the HTML chatbox"""
-        print(f"[UI] User input: {text}")
-        if global_brain:
-            threading.Thread(target=global_brain.process_input, args=(text,)).start()
-        else:
-            print("Brain not ready yet!")
-        return {"status": "sent"}
-
-    def frontend_ready(self):
-        return {"status": "ready"}
+    """Window controls callable from JavaScript; the conversation itself goes over the server's WebSocket"""
 
     def resize_window(self, width, height):
         window.resize(width, height)
 
     def close_app(self):
+        if server: server.shutdown()  # flush pending history writes
         window.destroy()
         os._exit(0)
 
 def start_background_services(window):
     """Starts AI Logic after window is visible"""
     global global_brain
-    time.sleep(1.5) 
     print("[System] Starting Brain...")
-    global_brain = Brain(window)
-    global_brain.start_life()
+    global_brain = server.open_desktop()
     print("[System] Brain Online.")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Luna AI")
+    parser.add_argument("--headless", action="store_true", help="serve the HTTP/WebSocket API without a window")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
     if not os.path.exists("assets"): os.makedirs("assets")
     if not os.path.exists("core"): os.makedirs("core")
 
-    api = Api()
-
-    window = webview.create_window(
-        'Luna AI',
-        'assets/index.html',
-        js_api=api,
-        width=WINDOW_WIDTH,
-        height=WINDOW_HEIGHT,
-        transparent=True,
-        on_top=True,
-        frameless=True,
-        draggable=True
-    )
-
-    webview.start(start_background_services, window, debug=False)
\ No newline at end of file
+    server = LunaServer(args.host, args.port, desktop=not args.headless)
+    if args.headless:
+        server.run()  # clients create their own sessions (POST /sessions or /ws)
+    else:
+        # The model loads while the window finishes opening; the page is a client of the local server
+        server.start()
+        api = Api()
+
+        window = webview.create_window(
+            'Luna AI',
+            f"{server.url}/#token={server.token}&session=desktop",  # the page's API token and session
+            js_api=api,
+            width=WINDOW_WIDTH,
+            height=WINDOW_HEIGHT,
+            transparent=True,
+            on_top=True,
+            frameless=True,
+            draggable=True
+        )
+
+        webview.start(start_background_services, window, debug=False)